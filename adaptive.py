@@ -0,0 +1,128 @@
+"""Retry backoff and adaptive concurrency for the download pool.
+
+RetryPolicy decides whether a failed item goes back to the queue and how
+long it waits first. AdaptiveController is an AIMD loop over the pool's
+parallel jobs and the downloader's per-job connections: a throttling
+response (HTTP 429/403, bot checks) halves both, and a run of successful
+downloads adds one back, up to the configured limits.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_RETRIES = 3
+RETRY_BASE = 5.0  # seconds before the first retry
+THROTTLE_RETRY_BASE = 30.0  # servers asking us to slow down get more room
+RETRY_CAP = 300.0
+# Retries inside one download (a fragment, a byte range, a request)
+TRANSFER_RETRY_BASE = 1.0
+TRANSFER_RETRY_CAP = 30.0
+GROW_AFTER = 4  # successful downloads per additive step
+CUT_COOLDOWN = 30.0  # one burst of throttled jobs counts as one signal
+
+_THROTTLE_RE = re.compile(r"HTTP Error (429|403)|Too Many Requests|confirm you.re not a bot", re.I)
+# Failures another attempt can't fix
+_PERMANENT_RE = re.compile(
+    r"Unsupported URL|Video unavailable|Private video|is not available|members.only"
+    r"|HTTP Error (404|410)|confirm your age|Requested format is not available|No space left",
+    re.I,
+)
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE, cap: float = RETRY_CAP) -> float:
+    """Exponential delay for the given 0-based attempt, with equal jitter.
+
+    Half the delay is fixed and half random, so retries keep a minimum
+    spacing but jobs that failed together don't come back together.
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def is_throttle(error: BaseException) -> bool:
+    return bool(_THROTTLE_RE.search(str(error)))
+
+
+class RetryPolicy:
+    """Up to `retries` further attempts per item, spaced by backoff_delay()."""
+
+    def __init__(
+        self,
+        retries: int = DEFAULT_RETRIES,
+        base: float = RETRY_BASE,
+        throttle_base: float = THROTTLE_RETRY_BASE,
+        cap: float = RETRY_CAP,
+    ):
+        self.retries = retries
+        self.base = base
+        self.throttle_base = throttle_base
+        self.cap = cap
+
+    def should_retry(self, attempts: int, error: BaseException) -> bool:
+        return attempts < self.retries and not _PERMANENT_RE.search(str(error))
+
+    def delay(self, attempts: int, throttled: bool = False) -> float:
+        return backoff_delay(attempts, self.throttle_base if throttled else self.base, self.cap)
+
+
+class AdaptiveController:
+    """AIMD limits for parallel jobs and connections per job.
+
+    The pool reports every outcome; when a report changes a limit the call
+    returns True and the pool applies `workers` and `connections`.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        connections: int,
+        grow_after: int = GROW_AFTER,
+        cooldown: float = CUT_COOLDOWN,
+    ):
+        self.grow_after = grow_after
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self.set_limits(workers, connections)
+
+    def set_limits(self, workers: int, connections: int):
+        """Set the ceilings and start from them, as for a fresh run."""
+        with self._lock:
+            self.max_workers = self.workers = max(1, workers)
+            self.max_connections = self.connections = max(1, connections)
+            self._successes = 0
+            self._last_cut = float("-inf")
+
+    def on_throttle(self) -> bool:
+        """Multiplicative decrease, at most once per cooldown."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_cut < self.cooldown:
+                return False
+            self._last_cut = now
+            self._successes = 0
+            workers, connections = max(1, self.workers // 2), max(1, self.connections // 2)
+            if (workers, connections) == (self.workers, self.connections):
+                return False
+            self.workers, self.connections = workers, connections
+        log.warning(f"Throttled; backing off to {workers} jobs x {connections} connections")
+        return True
+
+    def on_success(self) -> bool:
+        """Additive increase after `grow_after` healthy downloads in a row."""
+        with self._lock:
+            self._successes += 1
+            if self._successes < self.grow_after:
+                return False
+            self._successes = 0
+            if self.workers >= self.max_workers and self.connections >= self.max_connections:
+                return False
+            self.workers = min(self.workers + 1, self.max_workers)
+            self.connections = min(self.connections + 1, self.max_connections)
+            workers, connections = self.workers, self.connections
+        log.info(f"Transfers healthy; raising to {workers} jobs x {connections} connections")
+        return True
@@ -0,0 +1,158 @@
+"""Persistent index of finished downloads, used to skip work already done."""
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional
+
+from downloader import FORMAT_AUDIO_ONLY, FORMAT_VIDEO_AUDIO, FORMAT_VIDEO_ONLY, _get_ffmpeg_path
+from metadata_cache import cache_key
+
+log = logging.getLogger("ytdl")
+
+ANY_QUALITY = "*"
+AUDIO_EXTS = {"mp3", "m4a", "opus", "ogg", "aac", "flac", "wav"}
+VIDEO_EXTS = {"mp4", "mkv", "webm", "mov", "avi", "flv"}
+
+# Matches the "... [<video id>].<ext>" names produced by Downloader.download.
+# Only YouTube's 11-character ids are taken: for other sites the name
+# doesn't say which extractor the id belongs to.
+_ID_IN_NAME = re.compile(r"\[([\w-]{11})\]\.(\w+)$")
+_STREAM_TYPE = re.compile(r"^\s*Stream #\d+:\d+.*?: (Video|Audio):", re.M)
+PROBE_TIMEOUT = 30.0
+
+
+def item_identity(url: str, extractor: str = "", video_id: str = "") -> Optional[tuple[str, str]]:
+    """(extractor, video id) for an item, or None if either is unknown.
+
+    Both come from the item's metadata; without it only YouTube URLs, which
+    carry the id, are recognized.
+    """
+    if extractor and video_id:
+        return extractor.lower(), video_id
+    key = cache_key(url)
+    if key.startswith("youtube:video:"):
+        return "youtube", video_id or key.rsplit(":", 1)[1]
+    return None
+
+
+def probe_format(path: str) -> Optional[str]:
+    """FORMAT_VIDEO_AUDIO or FORMAT_VIDEO_ONLY from the streams in a video file.
+
+    None if ffmpeg isn't available or finds no video stream.
+    """
+    bundled = _get_ffmpeg_path()
+    ffmpeg = shutil.which("ffmpeg", path=bundled) if bundled else shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    try:
+        # With no output file ffmpeg exits non-zero, after listing the input's streams
+        proc = subprocess.run(
+            [ffmpeg, "-hide_banner", "-i", path],
+            stdin=subprocess.DEVNULL, capture_output=True, text=True, errors="replace", timeout=PROBE_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        log.warning(f"Could not probe {path}: {e}")
+        return None
+    streams = set(_STREAM_TYPE.findall(proc.stderr))
+    if "Video" not in streams:
+        return None
+    return FORMAT_VIDEO_AUDIO if "Audio" in streams else FORMAT_VIDEO_ONLY
+
+
+class DownloadArchive:
+    """Set of (extractor, video id, format, quality) keys backed by a text file.
+
+    Lookups are O(1) set membership. New keys are appended one per line, so
+    the file survives crashes without rewriting. Entries recovered by
+    rebuild() don't know the quality they were downloaded at and match any.
+    Items whose extractor or id is unknown are never recorded or matched.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._keys: set[tuple[str, str, str, str]] = set()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 4:
+                        self._keys.add(tuple(parts))
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def contains(self, extractor: str, video_id: str, fmt: str, quality: str) -> bool:
+        extractor = extractor.lower()
+        return (
+            (extractor, video_id, fmt, quality) in self._keys
+            or (extractor, video_id, fmt, ANY_QUALITY) in self._keys
+        )
+
+    def add(self, extractor: str, video_id: str, fmt: str, quality: str):
+        key = (extractor.lower(), video_id, fmt, quality)
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(" ".join(key) + "\n")
+
+    def contains_item(self, item) -> bool:
+        """Membership test for a QueueItem; items with no known id never match."""
+        ident = item_identity(item.url, item.extractor, item.video_id)
+        return ident is not None and self.contains(*ident, item.fmt, item.quality)
+
+    def add_item(self, item):
+        ident = item_identity(item.url, item.extractor, item.video_id)
+        if ident is not None:
+            self.add(*ident, item.fmt, item.quality)
+
+    def rebuild(self, output_dir: str) -> int:
+        """Replace the index with entries recovered from files in `output_dir`.
+
+        Only names carrying a YouTube "[<video id>]" tag are recognized.
+        Audio extensions map to FORMAT_AUDIO_ONLY; video files are probed
+        with ffmpeg for an audio stream to tell FORMAT_VIDEO_AUDIO from
+        FORMAT_VIDEO_ONLY, and skipped when that fails. Entries match any
+        quality. Returns the entry count.
+        """
+        keys: set[tuple[str, str, str, str]] = set()
+        skipped = 0
+        for root, _dirs, files in os.walk(output_dir):
+            for name in files:
+                m = _ID_IN_NAME.search(name)
+                if not m:
+                    continue
+                video_id, ext = m.group(1), m.group(2).lower()
+                if ext in AUDIO_EXTS:
+                    fmt = FORMAT_AUDIO_ONLY
+                elif ext in VIDEO_EXTS:
+                    fmt = probe_format(os.path.join(root, name))
+                    if fmt is None:
+                        skipped += 1
+                        continue
+                else:
+                    continue
+                keys.add(("youtube", video_id, fmt, ANY_QUALITY))
+        if skipped:
+            log.warning(f"Archive rebuild skipped {skipped} video file(s) whose streams could not be probed")
+
+        with self._lock:
+            self._keys = keys
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for key in sorted(keys):
+                    f.write(" ".join(key) + "\n")
+            os.replace(tmp, self.path)
+        log.info(f"Archive rebuilt from {output_dir}: {len(keys)} entries")
+        return len(keys)
@@ -0,0 +1,182 @@
+"""Process-wide bandwidth scheduler shared by every active download."""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+log = logging.getLogger("ytdl")
+
+BURST_SECONDS = 0.5  # how far ahead of its share a job may run
+ACTIVE_WINDOW = 2.0  # seconds without traffic before a job stops taking a share
+WAIT_SLICE = 0.1  # max sleep between re-reading limits, so changes apply live
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Parse a byte count such as 1048576, 512K or 10M. Raises ValueError."""
+    text = text.strip().upper().removesuffix("B")
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def parse_schedule(text: str) -> list[tuple[int, int, Optional[int]]]:
+    """Parse "09:00-18:00=1M,22:00-06:00=0" into (start, end, limit) windows.
+
+    Times are minutes after local midnight; a window whose end is not after
+    its start wraps past midnight. A limit of 0 means unlimited.
+    """
+    windows = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        span, _, rate = part.partition("=")
+        start, _, end = span.partition("-")
+        windows.append((_minutes(start), _minutes(end), parse_size(rate) or None))
+    return windows
+
+
+def _minutes(hhmm: str) -> int:
+    h, _, m = hhmm.strip().partition(":")
+    value = int(h) * 60 + int(m or 0)
+    if not 0 <= value <= 24 * 60:
+        raise ValueError(f"invalid time: {hhmm!r}")
+    return value
+
+
+def _check_weight(weight: float):
+    # A job's share of the limit is proportional to its weight
+    if not weight > 0:
+        raise ValueError(f"bandwidth weight must be positive, not {weight!r}")
+
+
+class _JobState:
+    __slots__ = ("weight", "tokens", "refilled_at", "seen_at")
+
+    def __init__(self, weight: float, now: float):
+        self.weight = weight
+        self.tokens = 0.0
+        self.refilled_at = now
+        self.seen_at = now
+
+
+class BandwidthScheduler:
+    """Weighted token buckets under one global rate limit.
+
+    The current limit (bytes/s, None = unlimited) is split between the jobs
+    that moved data recently, in proportion to their weights, so a weight-4
+    job gets four times the share of a weight-1 job while both are busy and
+    the whole limit once it is alone. Time-of-day windows override the base
+    limit. set_limit() and set_schedule() take effect within WAIT_SLICE,
+    including for transfers already waiting.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        schedule: Optional[list[tuple[int, int, Optional[int]]]] = None,
+    ):
+        self._lock = threading.Lock()
+        self._limit = limit
+        self._schedule = list(schedule or [])
+        self._jobs: dict[object, _JobState] = {}
+
+    def set_limit(self, limit: Optional[int]):
+        with self._lock:
+            self._limit = limit or None
+        log.info(f"Bandwidth limit: {limit or 'unlimited'}")
+
+    def set_schedule(self, schedule: list[tuple[int, int, Optional[int]]]):
+        with self._lock:
+            self._schedule = list(schedule)
+
+    def current_limit(self) -> Optional[int]:
+        """Limit in effect now: the first matching schedule window, else the base limit."""
+        t = time.localtime()
+        minute = t.tm_hour * 60 + t.tm_min
+        with self._lock:
+            for start, end, limit in self._schedule:
+                inside = start <= minute < end if start < end else (minute >= start or minute < end)
+                if inside:
+                    return limit
+            return self._limit
+
+    def job(self, weight: float = 1, cancel: Optional[threading.Event] = None) -> "JobThrottle":
+        _check_weight(weight)
+        return JobThrottle(self, weight, cancel)
+
+    def acquire(self, job: object, nbytes: int, weight: float = 1, cancel: Optional[threading.Event] = None):
+        """Block until `job` may move `nbytes` more bytes (or `cancel` is set)."""
+        _check_weight(weight)
+        if nbytes <= 0:
+            return
+        charged = False
+        while True:
+            limit = self.current_limit()
+            with self._lock:
+                now = time.monotonic()
+                state = self._jobs.get(job)
+                if state is None:
+                    state = self._jobs[job] = _JobState(weight, now)
+                state.weight = weight
+                state.seen_at = now
+                if limit is None:
+                    state.tokens = 0.0
+                    return
+
+                active = sum(s.weight for s in self._jobs.values() if now - s.seen_at < ACTIVE_WINDOW)
+                share = limit * weight / max(active, weight)
+                state.tokens = min(state.tokens + share * (now - state.refilled_at), share * BURST_SECONDS)
+                state.refilled_at = now
+                if not charged:
+                    # Charge up front; a negative balance is debt paid off by waiting
+                    state.tokens -= nbytes
+                    charged = True
+                if state.tokens >= 0:
+                    return
+                wait = min(-state.tokens / share, WAIT_SLICE)
+            if cancel is not None:
+                if cancel.wait(wait):
+                    return
+            else:
+                time.sleep(wait)
+
+    def release(self, job: object):
+        with self._lock:
+            self._jobs.pop(job, None)
+
+
+class JobThrottle:
+    """One download's handle on the scheduler.
+
+    consume() is for transfer loops that know each block size; on_progress()
+    derives the block sizes from yt-dlp progress dicts, per output file.
+    """
+
+    def __init__(self, scheduler: BandwidthScheduler, weight: float, cancel: Optional[threading.Event]):
+        self.scheduler = scheduler
+        self.weight = weight
+        self.cancel = cancel
+        self._lock = threading.Lock()
+        self._seen: dict[str, int] = {}
+
+    def consume(self, nbytes: int):
+        self.scheduler.acquire(self, nbytes, self.weight, self.cancel)
+
+    def on_progress(self, d: dict):
+        if d.get("status") != "downloading":
+            return
+        key = d.get("tmpfilename") or d.get("filename", "")
+        downloaded = d.get("downloaded_bytes") or 0
+        with self._lock:
+            # The first report is only a baseline: a resumed file starts at
+            # its .part size, which was transferred in an earlier run
+            delta = downloaded - self._seen.get(key, downloaded)
+            if key not in self._seen or delta > 0:
+                # Concurrent fragment threads may report out of order
+                self._seen[key] = downloaded
+        if delta > 0:
+            self.consume(delta)
+
+    def close(self):
+        self.scheduler.release(self)
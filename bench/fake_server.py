@@ -0,0 +1,226 @@
+"""Local stand-in for a video site, so benchmarks run without network access.
+
+Routes (sizes in bytes, all content synthetic and deterministic):
+
+    /media/<name>.mp4?size=N          progressive file, honours Range requests
+    /dash/<name>.mpd?size=N           DASH manifest (SegmentTemplate)
+    /dash/<name>/init.mp4, seg-<n>.m4s  its fragments
+    /playlist.rss?n=N&size=S[&kind=dash]  feed of N items, seen by yt-dlp's
+                                      generic extractor as a playlist
+
+Every request waits `latency` seconds before answering; bodies are sent
+at no more than `rate` bytes/s per connection when a rate is set.
+"""
+
+import hashlib
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_SIZE = 4 * 1024 * 1024
+SEGMENT_SIZE = 256 * 1024
+SEGMENT_SECONDS = 2
+WRITE_BLOCK = 64 * 1024
+
+# 1 MiB of pseudo-random bytes, repeated to build any file size
+_BLOCK = b"".join(hashlib.sha256(i.to_bytes(4, "big")).digest() for i in range(32768))
+
+
+def synthetic_bytes(offset: int, length: int) -> bytes:
+    """Slice [offset, offset + length) of the endless synthetic stream."""
+    out = bytearray()
+    while length > 0:
+        pos = offset % len(_BLOCK)
+        piece = _BLOCK[pos:pos + length]
+        out += piece
+        offset += len(piece)
+        length -= len(piece)
+    return bytes(out)
+
+
+def _mpd(name: str, size: int) -> str:
+    segments = max(1, math.ceil(size / SEGMENT_SIZE))
+    duration = segments * SEGMENT_SECONDS
+    bandwidth = SEGMENT_SIZE * 8 // SEGMENT_SECONDS
+    # One muxed representation, so format selection needs no ffmpeg merge
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S"
+     mediaPresentationDuration="PT{duration}S" profiles="urn:mpeg:dash:profile:isoff-live:2011">
+  <Period>
+    <AdaptationSet mimeType="video/mp4" segmentAlignment="true">
+      <Representation id="muxed" bandwidth="{bandwidth}" width="1280" height="720"
+                      codecs="avc1.4d401f,mp4a.40.2">
+        <SegmentTemplate timescale="1" duration="{SEGMENT_SECONDS}" startNumber="1"
+                         initialization="{name}/init.mp4" media="{name}/seg-$Number$.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeMediaServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._route(head=True)
+
+    def do_GET(self):
+        self._route(head=False)
+
+    def _route(self, head: bool):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        size = int(query.get("size", DEFAULT_SIZE))
+        path = parts.path
+
+        if re.fullmatch(r"/media/[\w.-]+\.mp4", path):
+            self._send_media(size, head)
+        elif m := re.fullmatch(r"/dash/([\w-]+)\.mpd", path):
+            self._send_text(_mpd(m.group(1), size), "application/dash+xml", head)
+        elif re.fullmatch(r"/dash/[\w.-]+/init\.mp4", path):
+            self._send_body(synthetic_bytes(0, 1024), "video/mp4", head)
+        elif m := re.fullmatch(r"/dash/[\w.-]+/seg-(\d+)\.m4s", path):
+            index = int(m.group(1))
+            self._send_body(synthetic_bytes(index * SEGMENT_SIZE, SEGMENT_SIZE), "video/mp4", head)
+        elif path == "/playlist.rss":
+            self._send_text(self._rss(int(query.get("n", 10)), size, query.get("kind", "media")), "application/rss+xml", head)
+        else:
+            self.send_error(404)
+
+    def _rss(self, n: int, size: int, kind: str) -> str:
+        base = f"http://{self.headers.get('Host')}"
+        items = []
+        for i in range(n):
+            if kind == "dash":
+                url = f"{base}/dash/item{i}.mpd?size={size}"
+            else:
+                url = f"{base}/media/item{i}.mp4?size={size}"
+            url = url.replace("&", "&amp;")
+            items.append(f"<item><title>item{i}</title><link>{url}</link></item>")
+        return (
+            '<?xml version="1.0"?><rss version="2.0"><channel><title>bench playlist</title>'
+            f"<link>{base}/</link>{''.join(items)}</channel></rss>"
+        )
+
+    def _send_media(self, size: int, head: bool):
+        start, end = 0, size
+        status = 200
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) + 1, size) if match.group(2) else size
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self.end_headers()
+        if not head:
+            self._write(start, end - start)
+
+    def _send_text(self, text: str, content_type: str, head: bool):
+        self._send_body(text.encode(), content_type, head)
+
+    def _send_body(self, body: bytes, content_type: str, head: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self._write_bytes(body)
+
+    def _write(self, offset: int, length: int):
+        sent = 0
+        while sent < length:
+            n = min(WRITE_BLOCK, length - sent)
+            self._paced_write(synthetic_bytes(offset + sent, n))
+            sent += n
+
+    def _write_bytes(self, body: bytes):
+        for pos in range(0, len(body), WRITE_BLOCK):
+            self._paced_write(body[pos:pos + WRITE_BLOCK])
+
+    def _paced_write(self, block: bytes):
+        self.wfile.write(block)
+        self.server.count_bytes(len(block))
+        if self.server.rate:
+            time.sleep(len(block) / self.server.rate)
+
+
+class FakeMediaServer(ThreadingHTTPServer):
+    """Threaded local media server; use as a context manager.
+
+    `latency` is added to every request (seconds); `rate` caps each
+    connection's body rate (bytes/s, None = as fast as possible).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, rate: Optional[int] = None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.rate = rate
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def media_url(self, name: str, size: int = DEFAULT_SIZE) -> str:
+        return f"{self.base_url}/media/{name}.mp4?size={size}"
+
+    def dash_url(self, name: str, size: int = DEFAULT_SIZE) -> str:
+        return f"{self.base_url}/dash/{name}.mpd?size={size}"
+
+    def playlist_url(self, n: int, size: int = DEFAULT_SIZE, kind: str = "media") -> str:
+        return f"{self.base_url}/playlist.rss?n={n}&size={size}&kind={kind}"
+
+    def handle_error(self, request, client_address):
+        # Clients hang up mid-body all the time (range probes, cancels)
+        pass
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_bytes(self, n: int):
+        with self._lock:
+            self.bytes_sent += n
+
+    def start(self) -> "FakeMediaServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-media", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeMediaServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,374 @@
+"""Offline benchmark suite: python -m bench [--baseline old.json] [-o new.json]
+
+Everything runs against bench.fake_server on 127.0.0.1 with a memory-only
+metadata cache and a temporary output directory, so runs are repeatable
+and need no network. Metric names end in their unit; for *_ms / *_us the
+lower value is better, for *_mbps / *_per_s the higher.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from bench.fake_server import FakeMediaServer
+from download_queue import SCHEDULES, DownloadPool, QueueItem, QueueStore
+from downloader import Downloader
+from enrich import queue_estimate
+from metadata_cache import MetadataCache
+from progress import ProgressHub
+
+log = logging.getLogger("ytdl")
+
+ROOT = Path(__file__).resolve().parent.parent
+MB = 1024 * 1024
+DEFAULT_TOLERANCE = 0.10
+LOWER_IS_BETTER = ("_ms", "_us")
+HIGHER_IS_BETTER = ("_mbps", "_per_s")
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _mbps(nbytes: int, seconds: float) -> float:
+    return round(nbytes / MB / seconds, 2) if seconds > 0 else 0.0
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+# ── Benchmarks ───────────────────────────────────────────────────────
+
+
+def bench_fetch_info(srv: FakeMediaServer, dl: Downloader, args) -> dict:
+    """Metadata extraction latency: fresh extraction, cache hits, playlist listing."""
+    cold = [_timed(lambda i=i: dl.fetch_info(srv.media_url(f"fetch{i}"), refresh=True)) for i in range(args.rounds)]
+    warm = [_timed(lambda i=i: dl.fetch_info(srv.media_url(f"fetch{i}"))) for i in range(args.rounds)]
+    playlist = _timed(lambda: dl.fetch_info(srv.playlist_url(args.items), refresh=True))
+    return {
+        "cold_p50_ms": _ms(_percentile(cold, 0.5)),
+        "cold_p95_ms": _ms(_percentile(cold, 0.95)),
+        "cached_mean_us": round(statistics.mean(warm) * 1e6, 1),
+        "playlist_ms": _ms(playlist),
+    }
+
+
+def bench_download(srv: FakeMediaServer, dl: Downloader, args, out: Path) -> dict:
+    """Single-item throughput for a progressive file (1 and N connections) and DASH."""
+    size = args.size
+    results = {}
+    connections = dl.connections
+    for label, conns in (("single", 1), ("segmented", connections)):
+        dl.connections = conns
+        # Ranges only pay off when the file spans several chunks
+        dl.chunk_size = max(size // (conns * 2), 1 * MB)
+        seconds = _timed(lambda: dl.download(srv.media_url(f"dl-{label}", size), str(out)))
+        results[f"{label}_mbps"] = _mbps(size, seconds)
+    dl.connections = connections
+    seconds = _timed(lambda: dl.download(srv.dash_url("dl-dash", size), str(out)))
+    results["dash_mbps"] = _mbps(size, seconds)
+    return results
+
+
+def bench_queue_drain(srv: FakeMediaServer, dl: Downloader, args, out: Path) -> dict:
+    """Time for a DownloadPool to drain an N-item playlist, end to end."""
+    url = srv.playlist_url(args.items, args.item_size)
+    items = QueueStore(
+        QueueItem(e.get("url") or e.get("webpage_url", ""), e.get("title", ""), "video_audio", "best")
+        for e in dl.iter_entries(url)
+    )
+    pool = DownloadPool(dl, workers=args.workers)
+    finished = threading.Event()
+    started = time.perf_counter()
+    pool.start(items, str(out), on_finished=finished.set)
+    finished.wait()
+    seconds = time.perf_counter() - started
+    stats = pool.stats()
+    failed = len(items) - items.count(QueueItem.STATUS_DONE)
+    return {
+        "drain_ms": _ms(seconds),
+        "items_per_s": round(len(items) / seconds, 2),
+        "aggregate_mbps": _mbps(stats["bytes"], seconds),
+        "failed": failed,
+    }
+
+
+def bench_schedule(srv: FakeMediaServer, dl: Downloader, args, out: Path) -> dict:
+    """Mean completion time of a mixed queue under each scheduling policy, and how
+    far the pool's predicted completion times were off."""
+    big = args.item_size * 8
+    results = {}
+    for name, schedule in SCHEDULES.items():
+        # One long video ahead of two playlists of short clips, sizes known as if enriched
+        items = QueueStore()
+        for i in range(args.items):
+            size = big if i == 0 else args.item_size
+            item = QueueItem(srv.media_url(f"{name}{i}", size), f"{name}{i}", "video_audio", "best", source=f"list{i % 2}")
+            item.est_size = size
+            items.append(item)
+        pool = DownloadPool(dl, workers=args.workers, schedule=schedule())
+        finished = threading.Event()
+        pool.start(items, str(out / name), on_finished=finished.set)
+        finished.wait()
+        stats = pool.stats()
+        results[f"{name}_mean_completion_ms"] = _ms(stats["mean_completion"])
+        results[f"{name}_completion_error_ms"] = _ms(stats["completion_error"])
+        results[f"{name}_failed"] = len(items) - items.count(QueueItem.STATUS_DONE)
+    return results
+
+
+def bench_cli_json(srv: FakeMediaServer, args, out: Path) -> dict:
+    """End-to-end `cli.py --json` run; every stdout line must be a JSON event."""
+    out.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        sys.executable, str(ROOT / "cli.py"), "--json", "--no-archive", "-j", str(args.workers),
+        "-o", str(out), srv.playlist_url(3, args.item_size),
+    ]
+    # A scratch HOME keeps the run away from the user's metadata cache and logs
+    env = dict(os.environ, HOME=str(out))
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    lines = proc.stdout.splitlines()
+    invalid = 0
+    for line in lines:
+        try:
+            json.loads(line)
+        except ValueError:
+            invalid += 1
+            log.error(f"cli --json wrote a non-JSON line: {line[:120]!r}")
+    return {"run_ms": _ms(seconds), "json_lines": len(lines), "invalid_lines": invalid, "exit_code": proc.returncode}
+
+
+def bench_shared_queue(srv: FakeMediaServer, args, out: Path) -> dict:
+    """`cli.py --shared` on N processes at once; every item must be downloaded exactly once."""
+    db = out / "queue.sqlite3"
+    url = srv.playlist_url(args.items, args.item_size)
+    procs = []
+    started = time.perf_counter()
+    for node in range(args.nodes):
+        node_out = out / f"node{node}"
+        node_out.mkdir(parents=True)
+        cmd = [
+            sys.executable, str(ROOT / "cli.py"), "--json", "--no-archive", "-j", str(args.workers),
+            "--shared", str(db), "-o", str(node_out), url,
+        ]
+        env = dict(os.environ, HOME=str(node_out))
+        procs.append(subprocess.Popen(
+            cmd, cwd=ROOT, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    codes = [proc.wait() for proc in procs]
+    seconds = time.perf_counter() - started
+    with sqlite3.connect(str(db)) as conn:
+        rows = conn.execute("SELECT status, claims FROM items").fetchall()
+    downloads = [path.name for path in out.glob("node*/*") if path.is_file() and not path.name.endswith(".part")]
+    done = sum(1 for status, _ in rows if status == QueueItem.STATUS_DONE)
+    return {
+        "run_ms": _ms(seconds),
+        "items": len(rows),
+        "done": done,
+        "reclaimed": sum(1 for _, claims in rows if claims > 1),
+        "duplicates": len(downloads) - len(set(downloads)),
+        "missing": args.items - len(set(downloads)),
+        "failed_nodes": sum(1 for code in codes if code),
+    }
+
+
+def _shared_queue_ok(result: dict, items: int) -> bool:
+    return result["items"] == result["done"] == items and not result["duplicates"] and not result["missing"]
+
+
+def bench_progress(args) -> dict:
+    """Cost of one progress callback through the pool and ProgressHub, and of a UI drain."""
+    hub = ProgressHub()
+    pool = DownloadPool(downloader=None)  # only the progress path is exercised
+    pool._on_progress = lambda item, d: hub.publish(id(item), d)
+    items = [QueueItem(f"u{i}", f"t{i}", "video_audio", "best") for i in range(4)]
+    dicts = [
+        {"status": "downloading", "downloaded_bytes": n * 65536, "total_bytes": 1 << 30,
+         "speed": 1e7, "eta": 10, "filename": "f.mp4", "tmpfilename": "f.mp4.part"}
+        for n in range(args.calls // len(items))
+    ]
+
+    def _publish():
+        for d in dicts:
+            for item in items:
+                pool._progress(item, d)
+
+    seconds = _timed(_publish)
+    calls = len(dicts) * len(items)
+    drains = []
+    for _ in range(200):
+        hub.publish(id(items[0]), dicts[-1])
+        drains.append(_timed(hub.drain))
+    return {
+        "callback_us": round(seconds / calls * 1e6, 3),
+        "drain_us": round(statistics.mean(drains) * 1e6, 2),
+    }
+
+
+def bench_refresh_queue_ui(args) -> dict:
+    """Cost of the GUI queue refresh (visible rows + queue summary) for a long queue."""
+    try:
+        import customtkinter as ctk
+
+        from queue_view import QueueListView
+
+        root = ctk.CTk()
+    except Exception as e:  # no display, or no Tk
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    try:
+        root.geometry("700x400")
+        items = QueueStore(QueueItem(f"u{i}", f"Video {i}", "video_audio", "best") for i in range(args.queue_items))
+        view = QueueListView(root, items, on_remove=lambda _: None, on_cancel=lambda _: None, height=300)
+        view.pack(fill="both", expand=True)
+        root.update()
+
+        def _refresh():
+            view.refresh()
+            queue_estimate(items.with_status(QueueItem.STATUS_PENDING))
+            root.update_idletasks()
+
+        _refresh()
+        costs = []
+        for i in range(args.rounds):
+            items[i % len(items)].status = QueueItem.STATUS_DONE  # force visible rows to re-render
+            view.scroll_to(i % max(1, len(items) - 20))
+            costs.append(_timed(_refresh))
+        return {
+            "queue_items": len(items),
+            "refresh_p50_ms": _ms(_percentile(costs, 0.5)),
+            "refresh_p95_ms": _ms(_percentile(costs, 0.95)),
+        }
+    finally:
+        root.destroy()
+
+
+# ── Results ──────────────────────────────────────────────────────────
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe metrics that got worse than `baseline` by more than `tolerance`."""
+    regressions = []
+    for group, metrics in current["results"].items():
+        old_group = baseline.get("results", {}).get(group, {})
+        for name, value in metrics.items():
+            old = old_group.get(name)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            if name.endswith(LOWER_IS_BETTER):
+                worse = change > tolerance
+            elif name.endswith(HIGHER_IS_BETTER):
+                worse = -change > tolerance
+            else:
+                continue
+            line = f"{group}.{name}: {old} -> {value} ({change:+.1%})"
+            print(("REGRESSION " if worse else "           ") + line, file=sys.stderr)
+            if worse:
+                regressions.append(line)
+    return regressions
+
+
+def _meta(args) -> dict:
+    import yt_dlp.version
+
+    return {
+        "time": time.time(),
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "yt_dlp": yt_dlp.version.__version__,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+    }
+
+
+BENCHMARKS = (
+    "fetch_info", "download", "queue_drain", "schedule", "cli_json", "shared_queue", "progress", "refresh_queue_ui",
+)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline performance benchmarks.")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Where to write the results JSON")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown, e.g. 0.1")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Run only these benchmarks")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake server delay per request (s)")
+    parser.add_argument("--rate", type=int, help="Fake server bytes/s per connection (default unthrottled)")
+    parser.add_argument("--rounds", type=int, default=20, help="Repetitions for latency benchmarks")
+    parser.add_argument("--size", type=int, default=64 * MB, help="File size for single-item downloads")
+    parser.add_argument("--items", type=int, default=20, help="Playlist length for queue drain and scheduling")
+    parser.add_argument("--item-size", type=int, default=2 * MB, help="File size per playlist item")
+    parser.add_argument("--workers", type=int, default=3, help="Pool workers for queue drain")
+    parser.add_argument("--nodes", type=int, default=3, help="Processes sharing one queue in shared_queue")
+    parser.add_argument("--calls", type=int, default=200_000, help="Progress callbacks to time")
+    parser.add_argument("--queue-items", type=int, default=5000, help="Queue length for the UI refresh benchmark")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING)
+    selected = args.only or BENCHMARKS
+    results: dict[str, dict] = {}
+
+    with FakeMediaServer(latency=args.latency, rate=args.rate) as srv, tempfile.TemporaryDirectory() as tmp:
+        dl = Downloader(cache=MetadataCache(None))
+        # Pay for the yt_dlp import and first session outside the measurements
+        dl.fetch_info(srv.media_url("warmup"))
+        for name in selected:
+            print(f"Running {name}...", file=sys.stderr)
+            out = Path(tmp) / name
+            if name == "fetch_info":
+                results[name] = bench_fetch_info(srv, dl, args)
+            elif name == "download":
+                results[name] = bench_download(srv, dl, args, out)
+            elif name == "queue_drain":
+                results[name] = bench_queue_drain(srv, dl, args, out)
+            elif name == "schedule":
+                results[name] = bench_schedule(srv, dl, args, out)
+            elif name == "cli_json":
+                results[name] = bench_cli_json(srv, args, out)
+            elif name == "shared_queue":
+                results[name] = bench_shared_queue(srv, args, out)
+            elif name == "progress":
+                results[name] = bench_progress(args)
+            elif name == "refresh_queue_ui":
+                results[name] = bench_refresh_queue_ui(args)
+            print(f"  {json.dumps(results[name])}", file=sys.stderr)
+        dl.close()
+
+    report = {"meta": _meta(args), "results": results}
+    Path(args.output).write_text(json.dumps(report, indent=1), encoding="utf-8")
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if results.get("cli_json", {}).get("invalid_lines"):
+        print("cli --json output is not valid JSON lines", file=sys.stderr)
+        return 1
+    if "shared_queue" in results and not _shared_queue_ok(results["shared_queue"], args.items):
+        print("shared queue did not download every item exactly once", file=sys.stderr)
+        return 1
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
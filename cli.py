@@ -0,0 +1,431 @@
+"""YouTube Downloader - headless command-line entry point.
+
+Never imports Tk or PIL, so it runs on machines without a display:
+
+    python cli.py URL [URL ...]
+    python cli.py -a urls.txt -f audio_only -q 192 -j 4 --json
+    cat urls.txt | python cli.py --json > progress.jsonl
+"""
+
+from startup import StartupTimer
+
+_startup = StartupTimer()
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+from downloader import (
+    AUDIO_QUALITIES,
+    DEFAULT_BUFFER_SIZE,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_CONNECTIONS,
+    FORMAT_AUDIO_ONLY,
+    FORMAT_VIDEO_AUDIO,
+    FORMAT_VIDEO_ONLY,
+    VIDEO_QUALITIES,
+    Downloader,
+    get_data_dir,
+)
+from adaptive import DEFAULT_RETRIES, AdaptiveController, RetryPolicy
+from archive import DownloadArchive
+from bandwidth import BandwidthScheduler, parse_schedule, parse_size
+from download_queue import DEFAULT_WORKERS, MAX_WORKERS, SCHEDULE_FIFO, SCHEDULES, DownloadPool, QueueItem, QueueStore
+from enrich import MetadataEnricher, format_duration, format_size
+from logsetup import rotating_file_handler, setup_logging
+from metrics import Metrics
+from postprocess import PostProcessStage, default_workers
+from progress import ProgressHub
+from shared_queue import DEFAULT_LEASE, SharedQueue, SharedQueueWorker
+from stream_cache import DEFAULT_MAX_BYTES, StreamCache
+
+log = logging.getLogger("ytdl")
+
+PROGRESS_INTERVAL = 0.5  # seconds between progress lines per run
+METRICS_INTERVAL = 10.0  # seconds between metrics file rewrites during a run
+
+
+class _Reporter:
+    """Writes events either as JSON lines (stdout) or human-readable text (stderr)."""
+
+    def __init__(self, as_json: bool):
+        self.as_json = as_json
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        with self._lock:
+            if self.as_json:
+                sys.stdout.write(json.dumps({"event": event, "time": time.time(), **fields}) + "\n")
+                sys.stdout.flush()
+            else:
+                text = self._format(event, fields)
+                if text:
+                    print(text, file=sys.stderr, flush=True)
+
+    @staticmethod
+    def _format(event: str, f: dict) -> str:
+        if event == "queued":
+            return f"+ {f['title']}"
+        if event == "status":
+            if f["status"] == QueueItem.STATUS_ERROR:
+                return f"✗ {f['title']}: {f['error']}"
+            if f["status"] == QueueItem.STATUS_DONE:
+                return f"✓ {f['title']}"
+            if f["status"] == QueueItem.STATUS_CANCELLED:
+                return f"- {f['title']} (cancelled)"
+            if f["status"] == QueueItem.STATUS_PENDING and f["error"]:
+                return f"↻ {f['title']} (retry {f['attempts']}): {f['error']}"
+            if f["post_status"] == QueueItem.POST_RUNNING:
+                return f"~ {f['title']} (converting)"
+            return ""
+        if event == "progress":
+            speed = f["speed"] / 1024 / 1024
+            return f"  {f['percent']:5.1f}%  {speed:.1f} MB/s  ({f['active']} active)"
+        if event == "enriched":
+            size = f", ~{format_size(f['est_size'])}" if f["est_size"] else ""
+            duration = format_duration(f["duration"]) if f["duration"] else "?"
+            return f"i {f['title']} [{duration}{size}]"
+        if event == "skipped":
+            return f"= {f['title']} (already downloaded)"
+        if event == "archive_rebuilt":
+            return f"Archive rebuilt from {f['output']}: {f['entries']} entries"
+        if event == "fetch_error":
+            return f"✗ {f['url']}: {f['error']}"
+        if event == "summary":
+            return (
+                f"Done: {f['done']} ok, {f['failed']} failed, {f['cancelled']} cancelled, {f['retried']} retries "
+                f"({f['bytes'] / 1024 / 1024:.1f} MB in {f['elapsed']:.1f}s, "
+                f"{f['schedule']} order: mean completion {f['mean_completion']:.1f}s, "
+                f"predicted within {f['completion_error']:.1f}s)"
+            )
+        return ""
+
+
+def _read_urls(args) -> list[str]:
+    urls = list(args.urls)
+    sources = []
+    if args.batch_file == "-" or (not urls and not args.batch_file and not sys.stdin.isatty()):
+        sources.append(sys.stdin)
+    elif args.batch_file:
+        sources.append(open(args.batch_file, encoding="utf-8"))
+    for src in sources:
+        with src:
+            for line in src:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    urls.append(line)
+    return urls
+
+
+def _size(text: str) -> int:
+    """argparse type for byte counts such as 1048576, 512K or 10M."""
+    try:
+        return parse_size(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}") from None
+
+
+def _schedule(text: str) -> list:
+    try:
+        return parse_schedule(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid schedule: {text!r}") from None
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Download YouTube videos without the GUI.")
+    parser.add_argument("urls", nargs="*", help="Video or playlist URLs")
+    parser.add_argument("-a", "--batch-file", help="File with one URL per line ('-' for stdin)")
+    parser.add_argument("-o", "--output", default=str(Path.home() / "Downloads"), help="Output directory")
+    parser.add_argument(
+        "-f", "--format", default=FORMAT_VIDEO_AUDIO,
+        choices=[FORMAT_VIDEO_AUDIO, FORMAT_VIDEO_ONLY, FORMAT_AUDIO_ONLY],
+    )
+    parser.add_argument(
+        "-q", "--quality",
+        help=f"Video: {', '.join(VIDEO_QUALITIES)} (default best). "
+             f"Audio: {', '.join(AUDIO_QUALITIES)} (default 192).",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_WORKERS, help="Parallel downloads")
+    parser.add_argument(
+        "--order", choices=list(SCHEDULES), default=SCHEDULE_FIFO,
+        help="Which queued item starts next: queue order, smallest estimated first (sjf; "
+             "sizes come from --enrich), or taking turns between the given URLs/playlists (fair)",
+    )
+    parser.add_argument(
+        "-N", "--connections", type=int, default=DEFAULT_CONNECTIONS,
+        help="Connections per download (byte ranges or concurrent fragments)",
+    )
+    parser.add_argument(
+        "--chunk-size", type=_size, default=DEFAULT_CHUNK_SIZE,
+        help="Bytes per ranged request, e.g. 10M (0 = one request per file)",
+    )
+    parser.add_argument("--buffer-size", type=_size, default=DEFAULT_BUFFER_SIZE, help="Read/write buffer, e.g. 256K")
+    parser.add_argument(
+        "--ffmpeg-workers", type=int, default=default_workers(),
+        help="Cores for merging/converting after download (0 = convert inline, one job at a time per download)",
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Merge/convert in one ffmpeg pass while downloading, writing each file once (no resume)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=DEFAULT_RETRIES,
+        help="Retry a failed download up to this many times, with growing delays (0 = never)",
+    )
+    parser.add_argument(
+        "--no-adaptive", action="store_true",
+        help="Keep --jobs and --connections fixed instead of lowering them while throttled",
+    )
+    parser.add_argument("--scratch-dir", help="Fast local directory for partial and intermediate files")
+    parser.add_argument(
+        "--stream-cache", metavar="DIR",
+        help="Keep downloaded streams here and reuse them for later jobs selecting the same stream",
+    )
+    parser.add_argument(
+        "--stream-cache-size", type=_size, default=DEFAULT_MAX_BYTES,
+        help="Evict least recently used streams past this size, e.g. 10G",
+    )
+    parser.add_argument("-r", "--limit-rate", type=_size, help="Total download rate limit, e.g. 2M (bytes/s)")
+    parser.add_argument(
+        "--schedule", type=_schedule, default=[],
+        help="Time-of-day limits overriding --limit-rate, e.g. '09:00-18:00=1M,18:00-09:00=0' (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--enrich", type=int, default=0, metavar="N",
+        help="Resolve duration/size of playlist entries ahead of download on N threads (0 = off)",
+    )
+    parser.add_argument(
+        "--shared", metavar="PATH",
+        help="Queue database on a shared filesystem; every node given it splits the work (URLs optional)",
+    )
+    parser.add_argument(
+        "--lease", type=float, default=DEFAULT_LEASE,
+        help="Seconds a node's claim on a --shared item lasts without a heartbeat",
+    )
+    parser.add_argument("--json", action="store_true", help="Emit JSON lines on stdout")
+    parser.add_argument("--refresh", action="store_true", help="Bypass the metadata cache")
+    parser.add_argument("--playlist-start", type=int, default=0, help="Skip this many playlist entries")
+    parser.add_argument("--playlist-limit", type=int, help="Enumerate at most this many playlist entries")
+    parser.add_argument(
+        "--archive", default=str(get_data_dir() / "archive.txt"),
+        help="Download archive used to skip videos already downloaded",
+    )
+    parser.add_argument("--no-archive", action="store_true", help="Download even if already archived")
+    parser.add_argument(
+        "--rebuild-archive", metavar="DIR",
+        help="Rebuild the archive by scanning DIR for downloaded files, then exit",
+    )
+    parser.add_argument("--metrics-json", help="Write per-phase timing metrics as JSON to this file")
+    parser.add_argument(
+        "--metrics-prom", help="Write metrics in the Prometheus textfile format (node_exporter textfile collector)",
+    )
+    parser.add_argument("--log-file", help="Log to this file (rotated) instead of stderr")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    if args.quality is None:
+        args.quality = "192" if args.format == FORMAT_AUDIO_ONLY else "best"
+    valid = AUDIO_QUALITIES if args.format == FORMAT_AUDIO_ONLY else VIDEO_QUALITIES
+    if args.quality not in valid:
+        parser.error(f"quality must be one of {', '.join(valid)} for {args.format}")
+    if not 1 <= args.jobs <= MAX_WORKERS:
+        parser.error(f"--jobs must be between 1 and {MAX_WORKERS}")
+    if args.connections < 1:
+        parser.error("--connections must be at least 1")
+    if args.retries < 0:
+        parser.error("--retries must not be negative")
+
+    setup_logging(
+        rotating_file_handler(Path(args.log_file)) if args.log_file else logging.StreamHandler(sys.stderr),
+        logging.INFO if args.verbose else logging.WARNING,
+    )
+    out = _Reporter(args.json)
+
+    archive = DownloadArchive(Path(args.archive))
+    if args.rebuild_archive:
+        out.emit("archive_rebuilt", output=args.rebuild_archive, entries=archive.rebuild(args.rebuild_archive))
+        return 0
+
+    urls = _read_urls(args)
+    if not urls and not args.shared:
+        parser.error("no URLs given")
+
+    downloader = Downloader(
+        connections=args.connections, chunk_size=args.chunk_size, buffer_size=args.buffer_size,
+        bandwidth=BandwidthScheduler(args.limit_rate, args.schedule),
+        stream_merge=args.stream, scratch_dir=args.scratch_dir, metrics=Metrics(),
+        stream_cache=StreamCache(Path(args.stream_cache), args.stream_cache_size) if args.stream_cache else None,
+    )
+    _startup.mark("ready")
+    out.emit("startup", ms=_startup.elapsed_ms("ready"))
+
+    queue = QueueStore()
+    fetch_errors = 0
+    hub = ProgressHub()
+    postprocess = PostProcessStage(args.ffmpeg_workers) if args.ffmpeg_workers > 0 else None
+    pool = DownloadPool(
+        downloader, workers=args.jobs, archive=archive, postprocess=postprocess,
+        retry=RetryPolicy(args.retries) if args.retries else None,
+        controller=None if args.no_adaptive else AdaptiveController(args.jobs, args.connections),
+        schedule=SCHEDULES[args.order](),
+    )
+    shared = worker = None
+    if args.shared:
+        shared = SharedQueue(Path(args.shared), lease=args.lease)
+        worker = SharedQueueWorker(shared, pool, queue)
+    finished = threading.Event()
+    enricher = None
+    if args.enrich > 0:
+        enricher = MetadataEnricher(
+            downloader, workers=args.enrich,
+            on_update=lambda item: out.emit(
+                "enriched", url=item.url, title=item.title, duration=item.duration, est_size=item.est_size,
+            ),
+        )
+
+    def _enqueue(item: QueueItem):
+        if not item.url:
+            return
+        if not args.no_archive and archive.contains_item(item):
+            out.emit("skipped", url=item.url, title=item.title)
+            return
+        if worker is not None:
+            # Nodes claim it from the shared queue; one queued elsewhere already is skipped
+            if shared.add([item]):
+                out.emit("queued", url=item.url, title=item.title)
+            return
+        queue.append(item)
+        out.emit("queued", url=item.url, title=item.title)
+        pool.notify_items()
+        if enricher is not None and not item.duration:
+            enricher.submit([item], len(queue) - 1)
+
+    def _entry_item(entry: dict, source: str) -> QueueItem:
+        return QueueItem(
+            entry.get("url") or entry.get("webpage_url", ""), entry.get("title", "Unknown"),
+            args.format, args.quality, video_id=entry.get("id", ""), extractor=entry.get("ie_key", ""),
+            source=source,
+        )
+
+    def _produce():
+        """Resolve URLs and stream playlist entries into the running pool."""
+        nonlocal fetch_errors
+        start, limit = args.playlist_start, args.playlist_limit
+        try:
+            for url in urls:
+                try:
+                    info = downloader.fetch_info(url, refresh=args.refresh, entries=False)
+                    if not info.is_playlist:
+                        _enqueue(QueueItem(url, info.title, args.format, args.quality, info=info))
+                    elif info.entries:
+                        end = None if limit is None else start + limit
+                        for entry in info.entries[start:end]:
+                            _enqueue(_entry_item(entry, url))
+                    else:
+                        for entry in downloader.iter_entries(info.url or url, start=start, limit=limit):
+                            _enqueue(_entry_item(entry, url))
+                except Exception as e:
+                    fetch_errors += 1
+                    out.emit("fetch_error", url=url, error=str(e))
+        finally:
+            if worker is not None:
+                worker.end_source()
+            else:
+                pool.end_producer()
+
+    def _on_update(item: QueueItem):
+        if worker is not None:
+            worker.on_update(item)
+        if item.status != QueueItem.STATUS_DOWNLOADING or item.post_status:
+            hub.finish(id(item))
+        out.emit(
+            "status", url=item.url, title=item.title, status=item.status,
+            post_status=item.post_status, error=item.error_msg, attempts=item.attempts,
+        )
+
+    # Downloads start as soon as the first entries are known
+    if worker is not None:
+        worker.begin_source()
+        worker.start()
+    else:
+        pool.begin_producer()
+    pool.start(
+        queue,
+        args.output,
+        on_update=_on_update,
+        on_progress=lambda item, d: hub.publish(id(item), d),
+        on_finished=finished.set,
+    )
+
+    def _export_metrics():
+        try:
+            if args.metrics_json:
+                downloader.metrics.write_json(Path(args.metrics_json))
+            if args.metrics_prom:
+                downloader.metrics.write_prometheus(Path(args.metrics_prom))
+        except OSError as e:
+            log.warning(f"Could not write metrics: {e}")
+
+    threading.Thread(target=_produce, daemon=True).start()
+    last_export = time.monotonic()
+    try:
+        while not finished.wait(PROGRESS_INTERVAL):
+            if time.monotonic() - last_export >= METRICS_INTERVAL:
+                _export_metrics()
+                last_export = time.monotonic()
+            snap = hub.drain()
+            if snap is not None and snap.active:
+                out.emit(
+                    "progress", active=snap.active, downloaded=snap.downloaded, total=snap.total,
+                    percent=round(snap.fraction * 100, 1), speed=snap.speed, eta=snap.eta,
+                )
+    except KeyboardInterrupt:
+        if worker is not None:
+            worker.stop()
+        pool.cancel_all()
+        finished.wait()
+
+    stats = pool.stats()
+    counts = {s: queue.count(s) for s in (QueueItem.STATUS_DONE, QueueItem.STATUS_ERROR, QueueItem.STATUS_CANCELLED)}
+    # Predicted vs actual completion per item; JSON output only
+    out.emit("completions", items=pool.completions())
+    out.emit(
+        "summary",
+        done=counts[QueueItem.STATUS_DONE],
+        failed=counts[QueueItem.STATUS_ERROR] + fetch_errors,
+        cancelled=counts[QueueItem.STATUS_CANCELLED],
+        retried=stats["retried"],
+        bytes=stats["bytes"],
+        elapsed=round(stats["elapsed"], 2),
+        avg_speed=stats["avg_speed"],
+        schedule=stats["schedule"],
+        mean_completion=round(stats["mean_completion"], 2),
+        completion_error=round(stats["completion_error"], 2),
+        cache_hits=downloader.stream_cache.hits if downloader.stream_cache else 0,
+    )
+    if enricher is not None:
+        enricher.close()
+    if postprocess is not None:
+        postprocess.shutdown()
+    _export_metrics()
+    downloader.close()
+    if shared is not None:
+        shared.close()
+    # An empty queue is success: everything was archived already, or a
+    # --shared node found nothing left for it
+    ok = not fetch_errors and counts[QueueItem.STATUS_DONE] == len(queue)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,725 @@
+"""Download queue items, the order they start in, and the parallel worker pool that drains them."""
+
+import logging
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from adaptive import AdaptiveController, RetryPolicy, is_throttle
+from downloader import AUDIO_QUALITIES, FORMAT_AUDIO_ONLY, VIDEO_QUALITIES, Downloader, VideoInfo
+from postprocess import PostProcessStage
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_WORKERS = 3
+MAX_WORKERS = 8
+
+# Bandwidth weights (see bandwidth.BandwidthScheduler)
+PRIORITY_LOW = 1
+PRIORITY_NORMAL = 2
+PRIORITY_HIGH = 4
+
+
+class QueueItem:
+    """Represents one item in the download queue.
+
+    Slotted, with the repeated fmt/quality/extractor strings interned, so
+    multi-thousand-entry playlists stay small. While the item belongs to a
+    QueueStore, assigning `status` also moves it in the store's indexes.
+    """
+
+    __slots__ = (
+        "id", "url", "title", "fmt", "quality", "_status", "error_msg", "info", "video_id", "extractor",
+        "priority", "duration", "est_size", "post_status", "output_dir", "resumed", "attempts", "retry_at",
+        "source", "started_at", "expected_at", "finished_at", "_store",
+    )
+
+    STATUS_PENDING = "pending"
+    STATUS_DOWNLOADING = "downloading"
+    STATUS_DONE = "done"
+    STATUS_ERROR = "error"
+    STATUS_CANCELLED = "cancelled"
+
+    # post_status: ffmpeg stage progress, tracked apart from the download.
+    # The item stays STATUS_DOWNLOADING until post-processing finishes.
+    POST_NONE = ""
+    POST_QUEUED = "queued"
+    POST_RUNNING = "running"
+    POST_DONE = "done"
+    POST_ERROR = "error"
+
+    def __init__(
+        self,
+        url: str,
+        title: str,
+        fmt: str,
+        quality: str,
+        info: Optional[VideoInfo] = None,
+        item_id: Optional[str] = None,
+        video_id: str = "",
+        extractor: str = "",
+        priority: int = PRIORITY_NORMAL,
+        source: str = "",
+    ):
+        self._store: Optional["QueueStore"] = None
+        self.id = item_id or uuid.uuid4().hex
+        self.url = url
+        self.title = title
+        self.fmt = sys.intern(fmt)
+        self.quality = sys.intern(quality)
+        self._status = self.STATUS_PENDING
+        self.error_msg = ""
+        # Already-extracted metadata, handed to download() to skip re-extraction
+        self.info = info
+        self.video_id = video_id or (info.id if info else "")
+        self.extractor = sys.intern(extractor or (info.extractor if info else ""))
+        self.priority = priority
+        # Filled from full metadata; playlist entries get them from MetadataEnricher
+        self.duration = info.duration if info else 0
+        self.est_size = info.estimate_size(fmt, quality) if info else 0
+        self.post_status = self.POST_NONE
+        # Fixed when the download first starts, so a resume reuses the .part files
+        self.output_dir = ""
+        self.resumed = False
+        # Failed attempts so far; a retried item stays pending until retry_at (monotonic)
+        self.attempts = 0
+        self.retry_at = 0.0
+        # The URL the user asked for: the playlist for its entries, else the item's own
+        self.source = sys.intern(source or url)
+        # Monotonic times of the last start, its predicted end and the actual end (0 = not yet)
+        self.started_at = 0.0
+        self.expected_at = 0.0
+        self.finished_at = 0.0
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        if self._store is None:
+            self._status = status
+        else:
+            self._store._move(self, status)
+
+
+class QueueStore:
+    """The download queue: QueueItems in order, indexed by status.
+
+    Reads like a sequence (len, indexing, slicing, iteration), which is all
+    QueueListView needs. Each status keeps an insertion-ordered dict of its
+    items, so counts and the next pending item cost O(1) rather than a scan
+    of the whole queue. Safe to use from worker and GUI threads at once.
+    """
+
+    def __init__(self, items: Iterable[QueueItem] = ()):
+        self._lock = threading.Lock()
+        self._items: list[QueueItem] = []
+        self._by_status: dict[str, dict[QueueItem, None]] = {}
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index: Union[int, slice]):
+        with self._lock:
+            return self._items[index]
+
+    def __iter__(self) -> Iterator[QueueItem]:
+        # A snapshot, so other threads may add and remove items meanwhile
+        with self._lock:
+            return iter(list(self._items))
+
+    def __contains__(self, item: QueueItem) -> bool:
+        return item._store is self
+
+    def append(self, item: QueueItem):
+        self.extend((item,))
+
+    def extend(self, items: Iterable[QueueItem]):
+        with self._lock:
+            for item in items:
+                if item._store is not None:
+                    raise ValueError(f"item {item.id} is already queued")
+                item._store = self
+                self._items.append(item)
+                self._by_status.setdefault(item._status, {})[item] = None
+
+    def remove(self, item: QueueItem):
+        with self._lock:
+            if item._store is not self:
+                raise ValueError(f"item {item.id} is not in this queue")
+            self._items.remove(item)
+            del self._by_status[item._status][item]
+            item._store = None
+
+    def retain(self, keep: Callable[[QueueItem], bool]) -> list[QueueItem]:
+        """Drop every item `keep` rejects, in one pass. Returns the dropped items."""
+        with self._lock:
+            kept, dropped = [], []
+            for item in self._items:
+                (kept if keep(item) else dropped).append(item)
+            for item in dropped:
+                del self._by_status[item._status][item]
+                item._store = None
+            self._items = kept
+        return dropped
+
+    def count(self, status: str) -> int:
+        return len(self._by_status.get(status, ()))
+
+    def with_status(self, status: str) -> list[QueueItem]:
+        with self._lock:
+            return list(self._by_status.get(status, ()))
+
+    def next_pending(self, now: float, schedule=None) -> Optional[QueueItem]:
+        """The pending item to start next among those not waiting out a retry delay at `now`.
+
+        `schedule` picks it (see FifoSchedule); without one it is the
+        longest-pending item.
+        """
+        with self._lock:
+            ready = (item for item in self._by_status.get(QueueItem.STATUS_PENDING, ()) if item.retry_at <= now)
+            if schedule is not None:
+                return schedule.pick(ready)
+            return next(ready, None)
+
+    def _move(self, item: QueueItem, status: str):
+        with self._lock:
+            if item._store is not self:
+                item._status = status
+                return
+            if status != item._status:
+                del self._by_status[item._status][item]
+                self._by_status.setdefault(status, {})[item] = None
+            item._status = status
+
+
+# ── Scheduling ───────────────────────────────────────────────────────
+
+SCHEDULE_FIFO = "fifo"
+SCHEDULE_SJF = "sjf"
+SCHEDULE_FAIR = "fair"
+
+# Typical video+audio bitrate (kbit/s) per VIDEO_QUALITIES entry, for items
+# whose formats aren't known yet. Audio-only qualities are bitrates already;
+# the middle one stands in for an unrecognized quality.
+_VIDEO_KBPS = dict(zip(VIDEO_QUALITIES, (8000, 5000, 2500, 1200, 700)))
+_AUDIO_KBPS = int(AUDIO_QUALITIES[len(AUDIO_QUALITIES) // 2])
+# Bytes/s one job is assumed to manage until a download of this run has finished
+ASSUMED_JOB_RATE = 1024 ** 2
+# Finished items whose predicted and actual completion completions() still reports
+COMPLETION_HISTORY = 5000
+
+
+def job_cost(item: QueueItem) -> int:
+    """Estimated bytes to download for `item`; 0 if neither its size nor its duration is known."""
+    if item.est_size:
+        return item.est_size
+    if not item.duration:
+        return 0
+    if item.fmt == FORMAT_AUDIO_ONLY:
+        kbps = int(item.quality) if item.quality.isdigit() else _AUDIO_KBPS
+    else:
+        kbps = _VIDEO_KBPS.get(item.quality, _VIDEO_KBPS["best"])
+    return item.duration * kbps * 125
+
+
+class FifoSchedule:
+    """Start pending items in the order they were queued."""
+
+    name = SCHEDULE_FIFO
+
+    def pick(self, ready: Iterator[QueueItem]) -> Optional[QueueItem]:
+        """Choose among `ready`, the startable pending items in queue order.
+
+        Called under the QueueStore's lock, once per item started.
+        """
+        return next(ready, None)
+
+
+class ShortestFirstSchedule(FifoSchedule):
+    """Start the smallest estimated download first (see job_cost).
+
+    Minimizes the mean time until items complete, so short clips don't wait
+    behind a long video. Items of unknown size go after every estimated one,
+    in queue order, and a steady supply of short items can hold back a long
+    one indefinitely.
+    """
+
+    name = SCHEDULE_SJF
+
+    def pick(self, ready: Iterator[QueueItem]) -> Optional[QueueItem]:
+        best, best_key = None, None
+        for item in ready:
+            cost = job_cost(item)
+            key = (cost == 0, cost)
+            if best_key is None or key < best_key:
+                best, best_key = item, key
+        return best
+
+
+class FairSchedule(FifoSchedule):
+    """Take turns between sources (see QueueItem.source), oldest item first within each.
+
+    A long playlist then shares the workers with whatever is queued after
+    it instead of holding them until it is done.
+    """
+
+    name = SCHEDULE_FAIR
+
+    def __init__(self):
+        self._turn = 0
+        self._served: dict[str, int] = {}
+
+    def pick(self, ready: Iterator[QueueItem]) -> Optional[QueueItem]:
+        heads: dict[str, QueueItem] = {}
+        for item in ready:
+            heads.setdefault(item.source, item)
+        if not heads:
+            return None
+        # Least recently served source; never-served ones in queue order
+        source = min(heads, key=lambda s: self._served.get(s, -1))
+        self._served[source] = self._turn
+        self._turn += 1
+        return heads[source]
+
+
+SCHEDULES = {cls.name: cls for cls in (FifoSchedule, ShortestFirstSchedule, FairSchedule)}
+
+
+class DownloadPool:
+    """Drains pending QueueItems with up to `workers` concurrent downloads.
+
+    Every in-flight item gets its own cancellation event, so a single item can
+    be cancelled without touching the others. Callbacks are invoked from the
+    worker threads; GUI callers must marshal them onto their own thread.
+
+    With a PostProcessStage, a worker moves on to the next item as soon as
+    the streams are downloaded; merging/transcoding finishes on the stage
+    and the item is completed from there.
+
+    With a RetryPolicy, a failed download goes back to pending and is
+    retried after a backoff delay. An AdaptiveController lowers the number
+    of jobs running at once (and the downloader's connections per job)
+    when downloads are throttled, and raises them again while they succeed.
+
+    `schedule` (one of SCHEDULES, FIFO by default; may be swapped while
+    running) chooses which pending item starts next. Every start predicts
+    the item's completion from its job_cost() and the bytes per second jobs
+    of this run have achieved; completions() compares that with the actual
+    completion.
+    """
+
+    def __init__(
+        self,
+        downloader: Downloader,
+        workers: int = DEFAULT_WORKERS,
+        archive=None,
+        postprocess: Optional[PostProcessStage] = None,
+        retry: Optional[RetryPolicy] = None,
+        controller: Optional[AdaptiveController] = None,
+        schedule: Optional[FifoSchedule] = None,
+    ):
+        self.downloader = downloader
+        self.workers = workers
+        self.retry = retry
+        self.controller = controller
+        self.schedule = schedule or FifoSchedule()
+        # Optional DownloadArchive recording every finished item
+        self.archive = archive
+        self.postprocess = postprocess
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._items = QueueStore()
+        self._handles: dict[int, threading.Event] = {}
+        self._alive = 0
+        # Jobs allowed in flight; below `workers` while the controller backs off
+        self._limit = workers
+        self._stopping = False
+        self._producers = 0
+        self._post_pending = 0
+
+        # Throughput accounting, reset on every start()
+        self._started_at = 0.0
+        self._finished_at = 0.0
+        self._bytes = 0
+        self._last_bytes: dict[int, dict[str, int]] = {}
+        self._speeds: dict[int, float] = {}
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        # Items in flight, the timings of finished ones, and estimated bytes vs
+        # busy seconds of those that succeeded
+        self._timed: dict[int, QueueItem] = {}
+        self._completions: deque[tuple] = deque(maxlen=COMPLETION_HISTORY)
+        self._done_cost = 0
+        self._done_time = 0.0
+        self._completion_sum = 0.0
+        self._completion_count = 0
+        self._error_sum = 0.0
+        self._error_count = 0
+
+        self._output_dir = ""
+        self._on_update: Optional[Callable[[QueueItem], None]] = None
+        self._on_progress: Optional[Callable[[QueueItem, dict], None]] = None
+        self._on_finished: Optional[Callable[[], None]] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._alive > 0 or self._post_pending > 0
+
+    @property
+    def has_producers(self) -> bool:
+        return self._producers > 0
+
+    def begin_producer(self):
+        """Register a source that is still adding items (e.g. a playlist being
+        enumerated). Idle workers wait for more items instead of exiting
+        until every producer has called end_producer()."""
+        with self._lock:
+            self._producers += 1
+
+    def end_producer(self):
+        with self._lock:
+            self._producers = max(self._producers - 1, 0)
+            self._wakeup.notify_all()
+
+    def notify_items(self):
+        """Wake idle workers after pending items were appended."""
+        with self._lock:
+            self._wakeup.notify_all()
+
+    def start(
+        self,
+        items: Union[QueueStore, Iterable[QueueItem]],
+        output_dir: str,
+        on_update: Optional[Callable[[QueueItem], None]] = None,
+        on_progress: Optional[Callable[[QueueItem, dict], None]] = None,
+        on_finished: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """Start draining `items`. Returns False if workers are already running.
+
+        A QueueStore is read live, so items appended while the pool runs
+        are picked up as workers become free; other iterables are copied.
+        """
+        if not isinstance(items, QueueStore):
+            items = QueueStore(items)
+        with self._lock:
+            if self._alive:
+                return False
+            self._items = items
+            self._output_dir = output_dir
+            self._on_update = on_update
+            self._on_progress = on_progress
+            self._on_finished = on_finished
+            self._stopping = False
+            self._started_at = time.monotonic()
+            self._finished_at = 0.0
+            self._bytes = 0
+            self._last_bytes.clear()
+            self._speeds.clear()
+            self._completed = 0
+            self._failed = 0
+            self._retried = 0
+            self._timed.clear()
+            self._completions.clear()
+            self._done_cost = 0
+            self._done_time = 0.0
+            self._completion_sum = 0.0
+            self._completion_count = 0
+            self._error_sum = 0.0
+            self._error_count = 0
+            count = max(1, min(self.workers, MAX_WORKERS))
+            self._alive = count
+            self._limit = count
+        if self.controller is not None:
+            self.controller.set_limits(count, self.controller.max_connections)
+            self._apply_limits()
+
+        for _ in range(count):
+            threading.Thread(target=self._worker, daemon=True).start()
+        return True
+
+    def cancel(self, item: QueueItem):
+        """Cancel a single item, whether it is pending or in flight."""
+        with self._lock:
+            handle = self._handles.get(id(item))
+            unclaimed = handle is None and item.status == QueueItem.STATUS_PENDING
+            if unclaimed:
+                item.status = QueueItem.STATUS_CANCELLED
+                # Started before, if it was waiting to be retried
+                self._forget(item)
+        if handle is not None:
+            handle.set()
+        elif unclaimed:
+            log.info(f"Download cancelled: {item.url}")
+            self._notify(item)
+
+    def cancel_all(self):
+        """Stop claiming new items and cancel everything in flight."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+            handles = list(self._handles.values())
+        for handle in handles:
+            handle.set()
+
+    def stats(self) -> dict:
+        """Aggregate throughput across all jobs since the last start()."""
+        with self._lock:
+            end = self._finished_at or time.monotonic()
+            elapsed = max(end - self._started_at, 1e-6) if self._started_at else 0.0
+            return {
+                "schedule": self.schedule.name,
+                "active": len(self._handles),
+                "completed": self._completed,
+                "failed": self._failed,
+                "retried": self._retried,
+                "limit": self._limit,
+                "bytes": self._bytes,
+                "elapsed": elapsed,
+                "avg_speed": self._bytes / elapsed if elapsed else 0.0,
+                "current_speed": sum(self._speeds.values()),
+                # Seconds from start() until an item completed, averaged
+                "mean_completion": (
+                    self._completion_sum / self._completion_count if self._completion_count else 0.0
+                ),
+                # Mean seconds between predicted and actual completion
+                "completion_error": self._error_sum / self._error_count if self._error_count else 0.0,
+            }
+
+    def completions(self) -> list[dict]:
+        """Predicted and actual completion of each item started since start(),
+        in seconds from start() (None while unknown), in start order.
+
+        Only the last COMPLETION_HISTORY finished items are kept.
+        """
+        with self._lock:
+            start = self._started_at
+            timings = list(self._completions)
+            timings += [self._timing(item) for item in self._timed.values()]
+        timings.sort(key=lambda t: t[4])
+        return [
+            {
+                "id": item_id,
+                "title": title,
+                "source": source,
+                "cost": cost,
+                "started": started - start,
+                "expected": expected - start if expected else None,
+                "actual": finished - start if finished else None,
+            }
+            for item_id, title, source, cost, started, expected, finished in timings
+        ]
+
+    @staticmethod
+    def _timing(item: QueueItem) -> tuple:
+        return item.id, item.title, item.source, job_cost(item), item.started_at, item.expected_at, item.finished_at
+
+    # ── Workers ──────────────────────────────────────────────────────
+
+    def _claim(self) -> Optional[tuple[QueueItem, threading.Event]]:
+        with self._lock:
+            while not self._stopping:
+                if len(self._handles) < self._limit:
+                    now = time.monotonic()
+                    item = self._items.next_pending(now, self.schedule)
+                    if item is not None:
+                        item.status = QueueItem.STATUS_DOWNLOADING
+                        self._predict(item, now)
+                        if not item.output_dir:
+                            item.output_dir = self._output_dir
+                        handle = threading.Event()
+                        self._handles[id(item)] = handle
+                        return item, handle
+                # Pending items this worker may not start yet keep it alive
+                if not self._producers and not self._items.count(QueueItem.STATUS_PENDING):
+                    break
+                self._wakeup.wait(timeout=1.0)
+        return None
+
+    def _worker(self):
+        try:
+            while True:
+                claimed = self._claim()
+                if claimed is None:
+                    break
+                self._run(*claimed)
+        finally:
+            with self._lock:
+                self._alive -= 1
+            self._maybe_finished()
+
+    def _predict(self, item: QueueItem, now: float):
+        """Record the start of `item` and when it should complete. Caller holds the lock."""
+        cost = job_cost(item)
+        rate = self._done_cost / self._done_time if self._done_cost and self._done_time else ASSUMED_JOB_RATE
+        item.started_at = now
+        item.expected_at = now + cost / rate if cost else 0.0
+        item.finished_at = 0.0
+        self._timed.pop(id(item), None)
+        self._timed[id(item)] = item
+
+    def _maybe_finished(self):
+        with self._lock:
+            last = self._alive == 0 and self._post_pending == 0 and not self._finished_at
+            if last:
+                self._finished_at = time.monotonic()
+        if last and self._on_finished:
+            self._on_finished()
+
+    def _run(self, item: QueueItem, handle: threading.Event):
+        self._notify(item)
+        error: Optional[Exception] = None
+        finish = None
+        try:
+            log.info(
+                f"Downloading: {item.url} fmt={item.fmt} quality={item.quality} dir={item.output_dir}"
+                f"{' (resuming)' if item.resumed else ''}"
+            )
+            finish = self.downloader.download(
+                url=item.url,
+                output_dir=item.output_dir,
+                fmt=item.fmt,
+                quality=item.quality,
+                progress_callback=lambda d: self._progress(item, d),
+                cancel_event=handle,
+                info=item.info,
+                priority=item.priority,
+                defer_postprocess=self.postprocess is not None,
+            )
+        except Exception as e:
+            error = e
+        finally:
+            item.info = None
+            with self._lock:
+                self._handles.pop(id(item), None)
+                self._speeds.pop(id(item), None)
+                self._wakeup.notify_all()
+
+        if error is not None and not handle.is_set():
+            if self._retry_later(item, error):
+                return
+            log.error(f"Download failed: {item.url}\n{''.join(traceback.format_exception(error))}")
+        if finish is None:
+            self._complete(item, error, cancelled=handle.is_set())
+            return
+
+        log.info(f"Downloaded, queued for post-processing: {item.title}")
+        item.post_status = QueueItem.POST_QUEUED
+        with self._lock:
+            self._post_pending += 1
+        self._notify(item)
+        self.postprocess.submit(
+            finish,
+            on_start=lambda: self._set_post_status(item, QueueItem.POST_RUNNING),
+            on_done=lambda err: self._post_done(item, err),
+        )
+
+    def _retry_later(self, item: QueueItem, error: Exception) -> bool:
+        """Put a failed item back as pending after a backoff delay, if allowed."""
+        throttled = is_throttle(error)
+        if throttled and self.controller is not None and self.controller.on_throttle():
+            self._apply_limits()
+        if self.retry is None or not self.retry.should_retry(item.attempts, error):
+            return False
+        delay = self.retry.delay(item.attempts, throttled)
+        item.attempts += 1
+        log.warning(f"Retrying in {delay:.0f}s ({item.attempts}/{self.retry.retries}): {item.url}: {error}")
+        with self._lock:
+            item.retry_at = time.monotonic() + delay
+            item.error_msg = str(error)
+            item.status = QueueItem.STATUS_PENDING
+            self._retried += 1
+        self._notify(item)
+        return True
+
+    def _apply_limits(self):
+        with self._lock:
+            self._limit = min(self.controller.workers, max(1, min(self.workers, MAX_WORKERS)))
+            self._wakeup.notify_all()
+        if self.downloader is not None:
+            self.downloader.connections = self.controller.connections
+
+    def _set_post_status(self, item: QueueItem, post_status: str):
+        item.post_status = post_status
+        self._notify(item)
+
+    def _post_done(self, item: QueueItem, error: Optional[Exception]):
+        item.post_status = QueueItem.POST_ERROR if error else QueueItem.POST_DONE
+        with self._lock:
+            self._post_pending -= 1
+        self._complete(item, error)
+        self._maybe_finished()
+
+    def _complete(self, item: QueueItem, error: Optional[Exception], cancelled: bool = False):
+        if error is None:
+            item.status = QueueItem.STATUS_DONE
+            item.error_msg = ""
+            log.info(f"Download OK: {item.title}")
+            if self.archive is not None:
+                self.archive.add_item(item)
+            if self.controller is not None and self.controller.on_success():
+                self._apply_limits()
+        elif cancelled:
+            item.status = QueueItem.STATUS_CANCELLED
+            log.info(f"Download cancelled: {item.url}")
+        else:
+            item.status = QueueItem.STATUS_ERROR
+            item.error_msg = str(error)
+        with self._lock:
+            if item.status == QueueItem.STATUS_DONE:
+                self._completed += 1
+                if id(item) in self._timed:
+                    item.finished_at = time.monotonic()
+                    cost = job_cost(item)
+                    if cost:
+                        self._done_cost += cost
+                        self._done_time += item.finished_at - item.started_at
+            elif item.status == QueueItem.STATUS_ERROR:
+                self._failed += 1
+            self._forget(item)
+        self._notify(item)
+
+    def _forget(self, item: QueueItem):
+        """Fold a finished item into the run's totals. Caller holds the lock.
+
+        Only items in flight keep per-item state, so a long-lived pool
+        doesn't grow with every item it has run.
+        """
+        self._last_bytes.pop(id(item), None)
+        if self._timed.pop(id(item), None) is None:
+            return
+        self._completions.append(self._timing(item))
+        if item.finished_at:
+            self._completion_sum += item.finished_at - self._started_at
+            self._completion_count += 1
+            if item.expected_at:
+                self._error_sum += abs(item.finished_at - item.expected_at)
+                self._error_count += 1
+
+    def _progress(self, item: QueueItem, d: dict):
+        filename = d.get("filename", "")
+        downloaded = d.get("downloaded_bytes") or 0
+        with self._lock:
+            last = self._last_bytes.setdefault(id(item), {})
+            delta = downloaded - last.get(filename, 0)
+            # Streams taken from the stream cache weren't transferred
+            if delta > 0 and not d.get("cached"):
+                self._bytes += delta
+            last[filename] = downloaded
+            if d.get("status") == "downloading":
+                self._speeds[id(item)] = d.get("speed") or 0.0
+            else:
+                self._speeds.pop(id(item), None)
+        if self._on_progress:
+            self._on_progress(item, d)
+
+    def _notify(self, item: QueueItem):
+        if self._on_update:
+            self._on_update(item)
@@ -1,35 +1,141 @@
 """yt-dlp wrapper for YouTube downloading."""
 
+import copy
+import itertools
+import json
+import logging
 import os
 import ssl
 import sys
 import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Iterator, Optional, Union
+from urllib.parse import parse_qs, urlsplit
 
-import certifi
-import yt_dlp
-
-# Fix SSL for PyInstaller bundles - set before any network calls
-os.environ["SSL_CERT_FILE"] = certifi.where()
-os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
-ssl._create_default_https_context = lambda purpose=None, cafile=None, capath=None: ssl.create_default_context(
-    purpose=purpose or ssl.Purpose.SERVER_AUTH, cafile=certifi.where()
+from adaptive import TRANSFER_RETRY_BASE, TRANSFER_RETRY_CAP, backoff_delay
+from bandwidth import BandwidthScheduler
+from metadata_cache import MetadataCache, cache_key
+from metrics import (
+    KIND_DOWNLOAD,
+    KIND_FETCH,
+    PHASE_EXTRACT,
+    PHASE_MERGE,
+    PHASE_POSTPROCESS,
+    PHASE_TRANSFER,
+    Metrics,
 )
+from stream_cache import StreamCache
+
+log = logging.getLogger("ytdl")
+
+_ssl_lock = threading.Lock()
+_ssl_configured = False
+
+
+def configure_ssl():
+    """Point SSL at certifi's CA bundle (needed in PyInstaller bundles).
+
+    Runs once, before the first network call rather than at import time.
+    """
+    global _ssl_configured
+    with _ssl_lock:
+        if _ssl_configured:
+            return
+        import certifi
+
+        os.environ["SSL_CERT_FILE"] = certifi.where()
+        os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
+        ssl._create_default_https_context = lambda purpose=None, cafile=None, capath=None: ssl.create_default_context(
+            purpose=purpose or ssl.Purpose.SERVER_AUTH, cafile=certifi.where()
+        )
+        _ssl_configured = True
+
+
+# Entry fields kept from a playlist's entries; the rest of yt-dlp's dict is dropped
+_ENTRY_FIELDS = ("url", "webpage_url", "title", "id", "duration", "ie_key")
+
+
+# Format fields kept for size estimates (see VideoInfo.estimate_size)
+_FORMAT_FIELDS = ("format_id", "ext", "vcodec", "acodec", "height", "tbr", "abr", "filesize")
+
+
+def _compact_entry(entry: dict) -> dict:
+    return {k: entry[k] for k in _ENTRY_FIELDS if entry.get(k) is not None}
+
+
+def _compact_format(fmt: dict) -> dict:
+    compact = {k: fmt[k] for k in _FORMAT_FIELDS if fmt.get(k) is not None}
+    if "filesize" not in compact and fmt.get("filesize_approx"):
+        compact["filesize"] = fmt["filesize_approx"]
+    return compact
 
 
 class VideoInfo:
     """Stores fetched video metadata."""
 
     def __init__(self, data: dict):
+        self.id: str = data.get("id", "")
+        self.extractor: str = data.get("extractor_key", "")
         self.title: str = data.get("title", "Unknown")
         self.channel: str = data.get("channel", data.get("uploader", "Unknown"))
-        self.duration: int = data.get("duration", 0)
+        self.duration: int = int(data.get("duration") or 0)
         self.thumbnail: str = data.get("thumbnail", "")
         self.url: str = data.get("webpage_url", "")
         self.is_playlist: bool = data.get("_type") == "playlist"
-        self.entries: list[dict] = data.get("entries", []) if self.is_playlist else []
-        self.playlist_count: int = data.get("playlist_count", len(self.entries))
+        self.entries: list[dict] = (
+            [_compact_entry(e) for e in data.get("entries") or [] if e] if self.is_playlist else []
+        )
+        self.playlist_count: int = data.get("playlist_count") or len(self.entries)
+        self.formats: list[dict] = [_compact_format(f) for f in data.get("formats") or []]
+        # Full sanitized info dict from a fresh extraction; lets download()
+        # skip re-extracting. Never cached, since format URLs expire.
+        self.raw: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        """Compact yt-dlp-shaped dict; VideoInfo(info.to_dict()) round-trips."""
+        data = {
+            "id": self.id,
+            "extractor_key": self.extractor,
+            "title": self.title,
+            "channel": self.channel,
+            "duration": self.duration,
+            "thumbnail": self.thumbnail,
+            "webpage_url": self.url,
+        }
+        if self.is_playlist:
+            data["_type"] = "playlist"
+            data["playlist_count"] = self.playlist_count
+            data["entries"] = self.entries
+        if self.formats:
+            data["formats"] = self.formats
+        return data
+
+    def estimate_size(self, fmt: str, quality: str) -> int:
+        """Rough output size in bytes for a download of `fmt`/`quality`, 0 if unknown.
+
+        Mirrors the format selection in Downloader.download: the tallest video
+        within `quality` plus the best audio stream for video+audio, or the
+        target MP3 bitrate times the duration for audio-only.
+        """
+        if fmt == FORMAT_AUDIO_ONLY:
+            # An unrecognized quality counts as the middle bitrate, as in job_cost()
+            kbps = int(quality) if quality.isdigit() else int(AUDIO_QUALITIES[len(AUDIO_QUALITIES) // 2])
+            return self.duration * kbps * 125  # kbit/s -> bytes
+        limit = int(quality) if quality.isdigit() else None
+        videos = [
+            f for f in self.formats
+            if f.get("vcodec") != "none" and (limit is None or (f.get("height") or 0) <= limit)
+        ]
+        if not videos:
+            return 0
+        picks = [max(videos, key=lambda f: (f.get("height") or 0, f.get("tbr") or 0))]
+        if fmt == FORMAT_VIDEO_AUDIO and picks[0].get("acodec") == "none":
+            audios = [f for f in self.formats if f.get("vcodec") == "none" and f.get("acodec") != "none"]
+            if audios:
+                picks.append(max(audios, key=lambda f: f.get("abr") or f.get("tbr") or 0))
+        return sum(f.get("filesize") or int((f.get("tbr") or 0) * 125 * self.duration) for f in picks)
 
     @property
     def duration_str(self) -> str:
@@ -64,6 +170,17 @@ AUDIO_QUALITY_LABELS = {
 }
 
 
+# Transfer tuning defaults (see Downloader.__init__)
+DEFAULT_CONNECTIONS = 4
+DEFAULT_CHUNK_SIZE = 10 * 1024 * 1024
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+
+def get_data_dir() -> Path:
+    """Return the per-user directory for caches and app state."""
+    return Path.home() / ".yt_downloader"
+
+
 def _get_ffmpeg_path() -> str | None:
     """Return path to bundled ffmpeg, or None to use system default."""
     if getattr(sys, "frozen", False):
@@ -75,29 +192,333 @@ def _get_ffmpeg_path() -> str | None:
     return None
 
 
+def _yt_dlp():
+    """Import yt_dlp on first use; its extractor registry is slow to load."""
+    configure_ssl()
+    import yt_dlp
+
+    return yt_dlp
+
+
+def _info_expired(info: dict, margin: float = 60) -> bool:
+    """True if the signed format URLs in `info` expire within `margin` seconds."""
+    for f in info.get("formats") or []:
+        expire = parse_qs(urlsplit(f.get("url", "")).query).get("expire")
+        if expire:
+            try:
+                return int(expire[0]) - margin <= time.time()
+            except ValueError:
+                return False
+    return False
+
+
+class _Session:
+    """A warm YoutubeDL plus the per-call progress hook currently bound to it."""
+
+    def __init__(self, opts: dict):
+        _yt_dlp()
+        from segmented import SegmentedYoutubeDL
+
+        self.progress_hook: Optional[Callable[[dict], None]] = None
+        self.ydl = SegmentedYoutubeDL(dict(
+            opts,
+            progress_hooks=[self._on_progress],
+            postprocessor_hooks=[self._on_postprocess],
+            # Called once per retry with the attempt number; returns the delay
+            retry_sleep_functions={kind: self._on_retry for kind in ("http", "fragment", "extractor")},
+        ))
+
+    def _on_progress(self, d: dict):
+        if self.progress_hook:
+            self.progress_hook(d)
+
+    def _on_postprocess(self, d: dict):
+        metrics = self.ydl.metrics
+        if metrics is not None and d.get("status") == "started":
+            metrics.enter(PHASE_MERGE if d.get("postprocessor") == "Merger" else PHASE_POSTPROCESS)
+
+    def _on_retry(self, n: int) -> float:
+        if self.ydl.metrics is not None:
+            self.ydl.metrics.retry()
+        return backoff_delay(n, TRANSFER_RETRY_BASE, TRANSFER_RETRY_CAP)
+
+
+class SessionPool:
+    """Keeps warm YoutubeDL instances keyed by their option set.
+
+    Reusing an instance keeps its extractors, HTTP keep-alive connections,
+    cookies and player-JS signature cache. An instance is lent to one thread
+    at a time, so callers on different threads never share a YoutubeDL.
+    """
+
+    def __init__(self, max_idle_per_key: int = 4, max_keys: int = 16):
+        self.max_idle_per_key = max_idle_per_key
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._idle: dict[str, list[_Session]] = {}
+
+    @staticmethod
+    def _key(opts: dict) -> str:
+        return json.dumps(opts, sort_keys=True, default=repr)
+
+    @contextmanager
+    def session(
+        self,
+        opts: dict,
+        progress_hook: Optional[Callable[[dict], None]] = None,
+        throttle=None,
+        deferred: Optional[list] = None,
+        metrics=None,
+        streams=None,
+    ):
+        """Borrow a YoutubeDL configured with `opts` for the duration of a with-block.
+
+        `throttle`, `deferred`, `metrics` and `streams` are bound to the
+        instance for the block; see segmented.SegmentedYoutubeDL.
+        """
+        key = self._key(opts)
+        with self._lock:
+            idle = self._idle.get(key)
+            session = idle.pop() if idle else None
+        if session is None:
+            session = _Session(opts)
+
+        session.progress_hook = progress_hook
+        session.ydl.throttle = throttle
+        session.ydl.deferred = deferred
+        session.ydl.metrics = metrics
+        session.ydl.streams = streams
+        try:
+            yield session.ydl
+        finally:
+            session.progress_hook = None
+            session.ydl.throttle = None
+            session.ydl.deferred = None
+            session.ydl.metrics = None
+            session.ydl.streams = None
+            self._release(key, session)
+
+    def _release(self, key: str, session: _Session):
+        evicted: list[_Session] = []
+        with self._lock:
+            idle = self._idle.pop(key, [])
+            # Re-insert to keep the dict ordered by most recent use
+            self._idle[key] = idle
+            if len(idle) < self.max_idle_per_key:
+                idle.append(session)
+            else:
+                evicted.append(session)
+            while len(self._idle) > self.max_keys:
+                oldest = next(iter(self._idle))
+                evicted.extend(self._idle.pop(oldest))
+        for s in evicted:
+            s.ydl.close()
+
+    def close(self):
+        """Close every idle session."""
+        with self._lock:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+        for s in sessions:
+            s.ydl.close()
+
+
 class Downloader:
-    """Wraps yt-dlp for fetching info and downloading."""
+    """Wraps yt-dlp for fetching info and downloading.
 
-    def __init__(self):
-        self._cancel_event = threading.Event()
+    Transfer tuning applies to downloads started after it is changed:
+    `connections` parallel connections per file (byte ranges for progressive
+    files, concurrent fragments for DASH/HLS), `chunk_size` bytes per ranged
+    request and `buffer_size` bytes per read/write. An optional
+    BandwidthScheduler caps the combined rate of all downloads.
+
+    With `stream_merge`, video+audio and audio-only downloads run as one
+    ffmpeg pass over the format URLs (see streaming.py), writing the output
+    once; such transfers can't resume and aren't bandwidth-limited.
+    `scratch_dir` holds partial and intermediate files, which are moved to
+    the output directory when complete.
+
+    Every extraction and download is timed per phase into `metrics` (see
+    metrics.py); pass a shared Metrics to export them.
+
+    With a `stream_cache`, downloaded streams are kept by (video, format) and
+    a later job selecting the same stream takes it from disk; audio-only jobs
+    prefer an audio stream already cached for the video. Stream-merge
+    transfers bypass the cache.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[MetadataCache] = None,
+        connections: int = DEFAULT_CONNECTIONS,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        bandwidth: Optional[BandwidthScheduler] = None,
+        stream_merge: bool = False,
+        scratch_dir: Optional[str] = None,
+        metrics: Optional[Metrics] = None,
+        stream_cache: Optional[StreamCache] = None,
+    ):
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.bandwidth = bandwidth
+        self.stream_merge = stream_merge
+        self.scratch_dir = scratch_dir
+        self.metrics = metrics or Metrics()
+        self.stream_cache = stream_cache
+        self._lock = threading.Lock()
+        self._active: set[threading.Event] = set()
         self._ffmpeg_path = _get_ffmpeg_path()
+        if cache is None:
+            cache = MetadataCache(get_data_dir() / "metadata.sqlite3")
+        self.cache = cache
+        self.sessions = SessionPool()
 
-    def fetch_info(self, url: str) -> VideoInfo:
-        """Fetch video/playlist metadata without downloading."""
+    def _base_opts(self) -> dict:
+        """Options shared by every YoutubeDL this downloader creates."""
         opts = {
             "quiet": True,
+            # quiet alone still prints [download] progress lines to stdout,
+            # which would corrupt `cli.py --json` output
+            "noprogress": True,
             "no_warnings": True,
-            "extract_flat": "in_playlist",
+            "cachedir": str(get_data_dir() / "yt-dlp-cache"),
         }
         if self._ffmpeg_path:
             opts["ffmpeg_location"] = self._ffmpeg_path
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            data = ydl.extract_info(url, download=False)
-        return VideoInfo(data)
+        return opts
+
+    def _transfer_opts(self) -> dict:
+        """yt-dlp options for multi-connection transfers; see segmented.py."""
+        return {
+            "concurrent_fragment_downloads": max(1, self.connections),
+            "http_chunk_size": self.chunk_size or None,
+            "buffersize": self.buffer_size,
+            "noresizebuffer": True,
+        }
+
+    def _fetch_opts(self) -> dict:
+        opts = self._base_opts()
+        opts["extract_flat"] = "in_playlist"
+        return opts
+
+    def warm_up(self):
+        """Import yt_dlp and build the metadata session ahead of the first fetch.
+
+        Meant to run on a background thread once the UI is visible.
+        """
+        with self.sessions.session(self._fetch_opts()):
+            pass
+
+    def close(self):
+        """Release pooled YoutubeDL sessions and the metadata cache."""
+        self.sessions.close()
+        self.cache.close()
+
+    def fetch_info(self, url: str, refresh: bool = False, entries: bool = True) -> VideoInfo:
+        """Fetch video/playlist metadata without downloading.
+
+        Results are served from the metadata cache when fresh; pass
+        refresh=True to bypass it and re-extract. With entries=False a
+        playlist returns after its first page with no entries listed (use
+        iter_entries() to stream them); such partial results are not cached.
+        """
+        key = cache_key(url)
+        if not refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return VideoInfo(cached)
+
+        with self.metrics.track(KIND_FETCH, url) as job, self.sessions.session(self._fetch_opts(), metrics=job) as ydl:
+            if entries:
+                data = ydl.extract_info(url, download=False)
+            else:
+                data = self._extract_unprocessed(ydl, url)
+                if data.get("_type") == "playlist":
+                    return VideoInfo(dict(data, entries=[]))
+                data = ydl.process_ie_result(data, download=False)
+            info = VideoInfo(data)
+            if not info.is_playlist:
+                info.raw = ydl.sanitize_info(data)
+        self.cache.put(key, info.to_dict())
+        return info
+
+    def iter_entries(self, url: str, start: int = 0, limit: Optional[int] = None) -> Iterator[dict]:
+        """Yield compact playlist entries as yt-dlp pages through the playlist.
+
+        Nothing is materialized up front, so callers can start on the first
+        entries while enumeration continues. `start` and `limit` select a
+        slice; pages before `start` are skipped where the extractor allows.
+        A full, unsliced enumeration is written to the metadata cache.
+        Yields nothing for a single video.
+        """
+        collected: Optional[list[dict]] = [] if start == 0 and limit is None else None
+        with self.sessions.session(self._fetch_opts()) as ydl:
+            data = self._extract_unprocessed(ydl, url)
+            if data.get("_type") != "playlist":
+                return
+            all_entries = data.get("entries") or []
+            end = None if limit is None else start + limit
+            if hasattr(all_entries, "getslice"):  # yt-dlp PagedList fetches only the pages it needs
+                entries = all_entries.getslice(start, end)
+            else:
+                entries = itertools.islice(all_entries, start, end)
+            for entry in entries:
+                if not entry:
+                    continue
+                compact = _compact_entry(entry)
+                if collected is not None:
+                    collected.append(compact)
+                yield compact
+
+        if collected is not None:
+            info = VideoInfo(dict(data, entries=collected))
+            self.cache.put(cache_key(url), info.to_dict())
+
+    @staticmethod
+    def _extract_unprocessed(ydl, url: str) -> dict:
+        """extract_info(process=False), following url redirects to the real result."""
+        data = ydl.extract_info(url, download=False, process=False)
+        for _ in range(5):
+            if data.get("_type") not in ("url", "url_transparent"):
+                break
+            data = ydl.extract_info(data["url"], download=False, process=False, ie_key=data.get("ie_key"))
+        return data
+
+    def _stream(self, ydl, data: dict, fmt: str, quality: str, hook: Callable[[dict], None]):
+        from streaming import stream_download
+
+        output = ydl.prepare_filename(data)
+        audio_bitrate = None
+        if fmt == FORMAT_AUDIO_ONLY:
+            output = str(Path(output).with_suffix(".mp3"))
+            audio_bitrate = quality
+        if os.path.exists(output):
+            log.info(f"Already downloaded: {output}")
+            size = os.path.getsize(output)
+            hook({"status": "finished", "downloaded_bytes": size, "total_bytes": size, "filename": output})
+            return
+        stream_download(ydl, data, output, hook, audio_bitrate=audio_bitrate, scratch_dir=self.scratch_dir)
+
+    def _cached_audio(self, info: Union[VideoInfo, dict, None]) -> list[str]:
+        """Format ids of audio streams of `info`'s video already in the stream cache."""
+        if self.stream_cache is None or self.stream_merge or info is None:
+            return []
+        if isinstance(info, VideoInfo):
+            video_id, extractor = info.id, info.extractor
+        else:
+            video_id, extractor = info.get("id"), info.get("extractor_key") or info.get("extractor")
+        if not (video_id and extractor):
+            return []
+        return self.stream_cache.audio_formats(extractor, video_id)
 
     def cancel(self):
-        """Signal cancellation for in-progress download."""
-        self._cancel_event.set()
+        """Signal cancellation for every in-progress download."""
+        with self._lock:
+            events = list(self._active)
+        for event in events:
+            event.set()
 
     def download(
         self,
@@ -106,7 +527,11 @@ class Downloader:
         fmt: str = FORMAT_VIDEO_AUDIO,
         quality: str = "best",
         progress_callback: Optional[Callable[[dict], None]] = None,
-    ):
+        cancel_event: Optional[threading.Event] = None,
+        info: Union[VideoInfo, dict, None] = None,
+        priority: float = 1,
+        defer_postprocess: bool = False,
+    ) -> Optional[Callable[[], None]]:
         """Download a single video/audio.
 
         Args:
@@ -116,22 +541,40 @@ class Downloader:
             quality: Video resolution string or audio bitrate string.
             progress_callback: Called with progress dict containing
                 'status', 'downloaded_bytes', 'total_bytes', 'speed', 'eta', 'filename'.
+            cancel_event: Per-job cancellation handle. Setting it aborts only
+                this download; a private one is created when omitted.
+            info: Previously extracted VideoInfo or yt-dlp info dict for `url`.
+                When it carries formats, extraction is skipped and the
+                download goes straight to format selection. If the stored
+                format URLs have gone stale, the URL is re-extracted once.
+            priority: Bandwidth weight relative to other running downloads.
+            defer_postprocess: Return as soon as the streams are on disk and
+                hand back the merge/audio extraction as a callable (None if
+                there is nothing to do), to run on a PostProcessStage.
         """
-        self._cancel_event.clear()
-        output_path = str(Path(output_dir) / "%(title)s.%(ext)s")
+        if cancel_event is None:
+            cancel_event = threading.Event()
+        stream = self.stream_merge and fmt != FORMAT_VIDEO_ONLY
 
-        opts: dict = {
-            "outtmpl": output_path,
-            "quiet": True,
-            "no_warnings": True,
-            "noplaylist": True,
-        }
-        if self._ffmpeg_path:
-            opts["ffmpeg_location"] = self._ffmpeg_path
+        opts = self._base_opts()
+        # The [id] tag lets DownloadArchive.rebuild() recognize finished files
+        opts["outtmpl"] = "%(title)s [%(id)s].%(ext)s"
+        opts["paths"] = {"home": output_dir}
+        if self.scratch_dir:
+            opts["paths"]["temp"] = self.scratch_dir
+        opts["noplaylist"] = True
+        # Keep .part files and continue them, so interrupted jobs resume
+        opts["continuedl"] = True
+        opts["nopart"] = False
+        opts.update(self._transfer_opts())
 
         # Format selection
+        raw = info.raw if isinstance(info, VideoInfo) else info
         if fmt == FORMAT_AUDIO_ONLY:
-            opts["format"] = "bestaudio/best"
+            # A cached stream is only reused if it is at least the MP3's bitrate
+            floor = f"[abr>={quality}]" if quality.isdigit() else ""
+            cached = [f"{format_id}{floor}" for format_id in self._cached_audio(info)]
+            opts["format"] = "/".join([*cached, "bestaudio/best"])
             opts["postprocessors"] = [
                 {
                     "key": "FFmpegExtractAudio",
@@ -160,14 +603,80 @@ class Downloader:
                 )
             opts["merge_output_format"] = "mp4"
 
+        if stream:
+            # streaming.py merges/converts while downloading
+            opts.pop("postprocessors", None)
+            defer_postprocess = False
+        if defer_postprocess:
+            # One ffmpeg thread per job, so the stage's worker count caps CPU use
+            opts["postprocessor_args"] = {"default": ["-threads", "1"]}
+
+        DownloadError = _yt_dlp().utils.DownloadError
+        job = self.metrics.job(KIND_DOWNLOAD, url)
+        job.enter(PHASE_EXTRACT)
+        throttle = self.bandwidth.job(priority, cancel_event) if self.bandwidth and not stream else None
+
         # Progress hook
         def _hook(d: dict):
-            if self._cancel_event.is_set():
-                raise yt_dlp.utils.DownloadError("Cancelled by user")
+            if cancel_event.is_set():
+                raise DownloadError("Cancelled by user")
+            job.on_progress(d)
+            if throttle and not d.get("throttled"):
+                # Blocking here holds off yt-dlp's next read
+                throttle.on_progress(d)
             if progress_callback:
                 progress_callback(d)
 
-        opts["progress_hooks"] = [_hook]
+        deferred: Optional[list] = [] if defer_postprocess else None
+        with self._lock:
+            self._active.add(cancel_event)
+        try:
+            fresh = bool(raw and raw.get("formats") and not _info_expired(raw))
+            with self.sessions.session(
+                opts, progress_hook=_hook, throttle=throttle, deferred=deferred, metrics=job,
+                streams=None if stream else self.stream_cache,
+            ) as ydl:
+                if stream:
+                    if fresh:
+                        data = ydl.process_ie_result(copy.deepcopy(raw), download=False)
+                    else:
+                        data = ydl.extract_info(url, download=False)
+                    # One ffmpeg pass: transfer and merge/convert can't be told apart
+                    job.enter(PHASE_TRANSFER)
+                    self._stream(ydl, data, fmt, quality, _hook)
+                    job.finish()
+                    return None
+                done = False
+                if fresh:
+                    try:
+                        ydl.process_ie_result(copy.deepcopy(raw), download=True)
+                        done = True
+                    except DownloadError as e:
+                        if cancel_event.is_set():
+                            raise
+                        log.warning(f"Download from stored info failed ({e}); re-extracting {url}")
+                        job.retry()
+                        job.enter(PHASE_EXTRACT)
+                if not done:
+                    ydl.download([url])
+        except BaseException:
+            job.finish(ok=False)
+            raise
+        finally:
+            if throttle:
+                throttle.close()
+            with self._lock:
+                self._active.discard(cancel_event)
+
+        if not deferred:
+            job.finish()
+            return None
+        # Waiting for a PostProcessStage worker isn't attributed to any phase
+        job.pause()
+
+        def _post_process():
+            with self.metrics.track_job(job), self.sessions.session(opts, metrics=job) as ydl:
+                for filename, data, files_to_move in deferred:
+                    ydl.post_process(filename, data, files_to_move)
 
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            ydl.download([url])
+        return _post_process
@@ -0,0 +1,145 @@
+"""Background metadata enrichment for flat playlist entries."""
+
+import itertools
+import logging
+import queue
+import threading
+from typing import Callable, Iterable, Optional
+
+from download_queue import QueueItem
+from downloader import Downloader
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_WORKERS = 4
+
+
+class MetadataEnricher:
+    """Resolves full metadata for queued items on a bounded thread pool.
+
+    Playlist enumeration (extract_flat) only yields a url and title per
+    entry. The enricher runs Downloader.fetch_info for each submitted item,
+    which stores the result in the metadata cache, and fills in the item's
+    duration, size estimate and ids. Work is served lowest queue position
+    first, so whatever downloads next is resolved first; items that have
+    left the pending state by the time a worker reaches them are skipped.
+
+    `on_update(item)` runs on a worker thread after an item is enriched.
+    """
+
+    def __init__(
+        self,
+        downloader: Downloader,
+        workers: int = DEFAULT_WORKERS,
+        on_update: Optional[Callable[[QueueItem], None]] = None,
+    ):
+        self.downloader = downloader
+        self.workers = max(1, workers)
+        self.on_update = on_update
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        # Tie-breaker, so equal positions keep submission order and items never compare
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._cancelled: set[int] = set()
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """Items waiting for a worker."""
+        return self._queue.qsize()
+
+    def submit(self, items: Iterable[QueueItem], start: int):
+        """Queue `items`, which sit at queue positions start, start + 1, ..."""
+        with self._lock:
+            if self._closed:
+                return
+            for position, item in enumerate(items, start):
+                self._cancelled.discard(id(item))
+                self._queue.put((position, next(self._seq), item))
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name="enrich", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def cancel(self, item: QueueItem):
+        """Drop `item` if it has not been enriched yet (e.g. it was removed)."""
+        with self._lock:
+            self._cancelled.add(id(item))
+
+    def clear(self):
+        """Drop all queued work. Fetches already in flight still finish."""
+        with self._lock:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._cancelled.clear()
+
+    def close(self):
+        """Stop the workers after their current fetch."""
+        self.clear()
+        with self._lock:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put((float("inf"), next(self._seq), None))
+
+    def _worker(self):
+        while True:
+            _, _, item = self._queue.get()
+            if item is None:
+                return
+            with self._lock:
+                if id(item) in self._cancelled:
+                    self._cancelled.discard(id(item))
+                    continue
+            if item.status != QueueItem.STATUS_PENDING or item.duration:
+                continue
+            try:
+                info = self.downloader.fetch_info(item.url)
+            except Exception as e:
+                log.warning(f"Enrichment failed for {item.url}: {e}")
+                continue
+            with self._lock:
+                if id(item) in self._cancelled:
+                    self._cancelled.discard(id(item))
+                    continue
+            self._apply(item, info)
+            if self.on_update:
+                self.on_update(item)
+
+    @staticmethod
+    def _apply(item: QueueItem, info):
+        item.duration = info.duration
+        item.est_size = info.estimate_size(item.fmt, item.quality)
+        item.video_id = item.video_id or info.id
+        item.extractor = item.extractor or info.extractor
+        if item.title in ("", "Unknown"):
+            item.title = info.title
+        # The VideoInfo itself isn't kept: download() can't use it once the
+        # format URLs have expired, and its formats list is large
+
+
+def queue_estimate(items: Iterable[QueueItem]) -> tuple[int, int, int]:
+    """(total seconds, total estimated bytes, items with known metadata) for pending items."""
+    seconds = size = known = 0
+    for item in items:
+        if item.status != QueueItem.STATUS_PENDING or not item.duration:
+            continue
+        seconds += item.duration
+        size += item.est_size
+        known += 1
+    return seconds, size, known
+
+
+def format_duration(seconds: int) -> str:
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def format_size(nbytes: int) -> str:
+    if nbytes >= 1024 ** 3:
+        return f"{nbytes / 1024 ** 3:.1f} GB"
+    return f"{nbytes / 1024 ** 2:.0f} MB"
@@ -0,0 +1,190 @@
+"""Crash-safe, append-only journal of download queue state."""
+
+import json
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Optional
+
+from download_queue import PRIORITY_NORMAL, QueueItem
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_COMPACT_THRESHOLD = 2000
+
+OP_ADD = "add"
+OP_STATUS = "status"
+OP_REMOVE = "remove"
+
+
+class QueueJournal:
+    """Records queue item state transitions as JSON lines.
+
+    Callers only enqueue records; a background thread writes them in
+    batches and fsyncs after each batch, so the download hot path never
+    waits on disk. When the log grows well past the number of live items it
+    is compacted into a fresh snapshot and atomically swapped in. A torn
+    last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path: Path, compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        self.path = Path(path)
+        self.compact_threshold = compact_threshold
+        self._queue: queue.Queue[Optional[dict]] = queue.Queue()
+        self._state: dict[str, dict] = {}
+        self._records = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # ── Loading ──────────────────────────────────────────────────────
+
+    def load(self) -> list[QueueItem]:
+        """Replay the journal and return the surviving items in queue order.
+
+        Items that were downloading when the app stopped come back as pending
+        with their output_dir kept, so yt-dlp continues from the .part file.
+        Must be called before the journal starts writing.
+        """
+        self._state.clear()
+        self._records = 0
+        try:
+            with open(self.path, "r+b") as f:
+                end = 0  # just past the last complete line
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final write from a crash
+                    end += len(line)
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue
+                    self._records += 1
+                # Cut a torn tail off, or the next append would extend it
+                # into one more unreadable line
+                if f.seek(0, os.SEEK_END) > end:
+                    log.warning(f"Dropping a partial record at the end of {self.path}")
+                    f.truncate(end)
+        except FileNotFoundError:
+            pass
+
+        items = []
+        for rec in self._state.values():
+            item = QueueItem(
+                rec["url"], rec["title"], rec["fmt"], rec["quality"], item_id=rec["id"],
+                video_id=rec.get("video_id", ""), extractor=rec.get("extractor", ""),
+                priority=rec.get("priority", PRIORITY_NORMAL), source=rec.get("source", ""),
+            )
+            item.status = rec.get("status", QueueItem.STATUS_PENDING)
+            item.error_msg = rec.get("error", "")
+            item.output_dir = rec.get("output_dir", "")
+            if item.status == QueueItem.STATUS_DOWNLOADING:
+                item.status = QueueItem.STATUS_PENDING
+                item.resumed = True
+            items.append(item)
+        return items
+
+    # ── Recording ────────────────────────────────────────────────────
+
+    def add(self, item: QueueItem):
+        self._put({
+            "op": OP_ADD, "id": item.id, "url": item.url, "title": item.title,
+            "fmt": item.fmt, "quality": item.quality,
+            "video_id": item.video_id, "extractor": item.extractor, "priority": item.priority,
+            "source": item.source,
+        })
+
+    def update(self, item: QueueItem):
+        self._put({
+            "op": OP_STATUS, "id": item.id, "status": item.status,
+            "error": item.error_msg, "output_dir": item.output_dir,
+        })
+
+    def remove(self, item: QueueItem):
+        self._put({"op": OP_REMOVE, "id": item.id})
+
+    def close(self):
+        """Flush pending records and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _put(self, record: dict):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="journal", daemon=True)
+            self._thread.start()
+        self._queue.put(record)
+
+    # ── Writer thread ────────────────────────────────────────────────
+
+    def _apply(self, rec: dict):
+        op = rec["op"]
+        if op == OP_ADD:
+            self._state[rec["id"]] = dict(rec, status=QueueItem.STATUS_PENDING)
+        elif op == OP_STATUS:
+            state = self._state.get(rec["id"])
+            if state is not None:
+                state.update(status=rec["status"], error=rec.get("error", ""), output_dir=rec.get("output_dir", ""))
+        elif op == OP_REMOVE:
+            self._state.pop(rec["id"], None)
+
+    def _writer(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, "a", encoding="utf-8")
+        try:
+            stop = False
+            while not stop:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                lines = []
+                for rec in batch:
+                    if rec is None:
+                        stop = True
+                        continue
+                    self._apply(rec)
+                    lines.append(json.dumps(rec, ensure_ascii=False) + "\n")
+                if lines:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._records += len(lines)
+                # Compaction writes at most two records per live item
+                if self._records > max(self.compact_threshold, 4 * len(self._state)):
+                    f.close()
+                    self._compact()
+                    f = open(self.path, "a", encoding="utf-8")
+        except Exception:
+            log.exception("Queue journal writer failed")
+        finally:
+            f.close()
+
+    def _compact(self):
+        """Rewrite the journal as one add (+ status) record per live item."""
+        tmp = self.path.with_suffix(".tmp")
+        count = 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            for state in self._state.values():
+                add = {
+                    k: state.get(k, "")
+                    for k in ("id", "url", "title", "fmt", "quality", "video_id", "extractor", "source")
+                }
+                add["priority"] = state.get("priority", PRIORITY_NORMAL)
+                f.write(json.dumps(dict(add, op=OP_ADD), ensure_ascii=False) + "\n")
+                count += 1
+                if state.get("status", QueueItem.STATUS_PENDING) != QueueItem.STATUS_PENDING or state.get("output_dir"):
+                    status = {
+                        "op": OP_STATUS, "id": state["id"], "status": state["status"],
+                        "error": state.get("error", ""), "output_dir": state.get("output_dir", ""),
+                    }
+                    f.write(json.dumps(status, ensure_ascii=False) + "\n")
+                    count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        log.info(f"Queue journal compacted: {self._records} -> {count} records")
+        self._records = count
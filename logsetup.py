@@ -0,0 +1,37 @@
+"""Non-blocking logging: records go through a queue to one writer thread."""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+def rotating_file_handler(
+    path: Path, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+) -> logging.Handler:
+    """File handler that rolls over to path.1 .. path.N at `max_bytes`."""
+    return RotatingFileHandler(str(path), maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+
+
+def setup_logging(handler: logging.Handler, level: int = logging.INFO) -> QueueListener:
+    """Route root logging through a queue to `handler`.
+
+    Worker threads only enqueue the record; formatting and I/O happen on
+    the listener thread, so a slow disk never stalls a download. The
+    listener is flushed and stopped at interpreter exit.
+    """
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(records))
+    return listener
@@ -1,38 +1,18 @@
 """YouTube Downloader - CustomTkinter GUI Application."""
 
-import io
 import logging
-import os
-import ssl
 import sys
 import threading
+import time
 import traceback
 from pathlib import Path
 from tkinter import filedialog
-from urllib.request import urlopen
-
-# Setup logging to file on user's Desktop
-_log_path = Path.home() / "Desktop" / "yt_downloader_log.txt"
-logging.basicConfig(
-    filename=str(_log_path),
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
-log = logging.getLogger("ytdl")
-log.info("=== App started ===")
-log.info(f"Python: {sys.version}")
-log.info(f"Platform: {sys.platform}")
-log.info(f"Frozen: {getattr(sys, 'frozen', False)}")
-
-# Fix SSL certificate issue in PyInstaller bundle
-if getattr(sys, "frozen", False):
-    import certifi
-    os.environ["SSL_CERT_FILE"] = certifi.where()
-    os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
-    log.info(f"SSL_CERT_FILE: {certifi.where()}")
+
+from startup import StartupTimer, warm_imports
+
+_startup = StartupTimer()
 
 import customtkinter as ctk
-from PIL import Image
 
 from downloader import (
     AUDIO_QUALITIES,
@@ -44,29 +24,72 @@ from downloader import (
     FORMAT_VIDEO_ONLY,
     Downloader,
     VideoInfo,
+    get_data_dir,
+)
+from download_queue import (
+    DEFAULT_WORKERS,
+    MAX_WORKERS,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    SCHEDULE_FAIR,
+    SCHEDULE_FIFO,
+    SCHEDULE_SJF,
+    SCHEDULES,
+    DownloadPool,
+    QueueItem,
+    QueueStore,
 )
+from adaptive import AdaptiveController, RetryPolicy
+from archive import DownloadArchive
+from bandwidth import BandwidthScheduler
+from enrich import MetadataEnricher, format_duration, format_size, queue_estimate
+from journal import QueueJournal
+from logsetup import rotating_file_handler, setup_logging
+from metrics import Metrics
+from postprocess import PostProcessStage
+from progress import DEFAULT_FPS, ProgressHub
+from queue_view import QueueListView
+from stream_cache import StreamCache
+from thumbnails import ThumbnailLoader
+
+log = logging.getLogger("ytdl")
+
+_startup.mark("imports")
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
 DEFAULT_OUTPUT = str(Path.home() / "Downloads")
-
-
-class QueueItem:
-    """Represents one item in the download queue."""
-
-    STATUS_PENDING = "pending"
-    STATUS_DOWNLOADING = "downloading"
-    STATUS_DONE = "done"
-    STATUS_ERROR = "error"
-
-    def __init__(self, url: str, title: str, fmt: str, quality: str):
-        self.url = url
-        self.title = title
-        self.fmt = fmt
-        self.quality = quality
-        self.status = self.STATUS_PENDING
-        self.error_msg = ""
+STARTUP_REPORT = get_data_dir() / "startup_timings.jsonl"
+THUMB_SIZE = (192, 108)
+QUEUE_JOURNAL = get_data_dir() / "queue.jsonl"
+PLAYLIST_BATCH = 50
+DOWNLOAD_ARCHIVE = get_data_dir() / "archive.txt"
+METRICS_JSON = get_data_dir() / "metrics.json"
+METRICS_PROM = get_data_dir() / "metrics.prom"
+STREAM_CACHE = get_data_dir() / "streams"
+RATE_LIMITS = {
+    "무제한": None,
+    "1 MB/s": 1024 ** 2,
+    "2 MB/s": 2 * 1024 ** 2,
+    "5 MB/s": 5 * 1024 ** 2,
+    "10 MB/s": 10 * 1024 ** 2,
+}
+PRIORITY_LABELS = {"낮음": PRIORITY_LOW, "보통": PRIORITY_NORMAL, "높음": PRIORITY_HIGH}
+ORDER_LABELS = {"추가 순서": SCHEDULE_FIFO, "작은 항목 먼저": SCHEDULE_SJF, "재생목록 번갈아": SCHEDULE_FAIR}
+
+
+def _setup_logging():
+    """Log to a rotating file on the user's Desktop (home directory if there is none)."""
+    log_dir = Path.home() / "Desktop"
+    if not log_dir.is_dir():
+        log_dir = Path.home()
+    setup_logging(rotating_file_handler(log_dir / "yt_downloader_log.txt"), logging.DEBUG)
+    log.info("=== App started ===")
+    log.info(f"Python: {sys.version}")
+    log.info(f"Platform: {sys.platform}")
+    log.info(f"Frozen: {getattr(sys, 'frozen', False)}")
 
 
 class App(ctk.CTk):
@@ -74,17 +97,76 @@ class App(ctk.CTk):
         super().__init__()
 
         self.title("YouTube Downloader")
-        self.geometry("700x780")
+        self.geometry("700x820")
         self.minsize(620, 700)
 
-        self.downloader = Downloader()
+        self.bandwidth = BandwidthScheduler()
+        self.metrics = Metrics()
+        self.downloader = Downloader(
+            bandwidth=self.bandwidth, metrics=self.metrics, stream_cache=StreamCache(STREAM_CACHE),
+        )
+        self.archive = DownloadArchive(DOWNLOAD_ARCHIVE)
+        self.postprocess = PostProcessStage()
+        self.pool = DownloadPool(
+            self.downloader, archive=self.archive, postprocess=self.postprocess, retry=RetryPolicy(),
+            # Its job ceiling follows the workers menu on every start
+            controller=AdaptiveController(DEFAULT_WORKERS, self.downloader.connections),
+        )
+        self.enricher = MetadataEnricher(self.downloader, on_update=self._on_enriched)
+        self._summary_scheduled = False
+        self.progress = ProgressHub()
+        self.thumbnails = ThumbnailLoader(
+            get_data_dir() / "thumbnails",
+            make_image=lambda img, size: ctk.CTkImage(light_image=img, dark_image=img, size=size),
+        )
         self.current_info: VideoInfo | None = None
         self.output_dir = DEFAULT_OUTPUT
-        self.queue: list[QueueItem] = []
+        self.journal = QueueJournal(QUEUE_JOURNAL)
+        self.queue = QueueStore(self.journal.load())
         self.is_downloading = False
+        self._closing = False
 
         self._build_ui()
         self._fix_ime_clipboard()
+        self._poll_progress()
+
+        self.bind("<Map>", self._on_first_map, add="+")
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        if self.queue:
+            pending = self.queue.count(QueueItem.STATUS_PENDING)
+            self._refresh_queue_ui()
+            self._set_status(f"이전 큐 복원됨 ({pending}개 대기)", "#28a745")
+
+    # ── Startup / shutdown ───────────────────────────────────────────
+
+    def _on_first_map(self, _event=None):
+        if _startup.mark("window"):
+            # Pay for yt_dlp's extractor registry and SSL setup off the UI thread
+            threading.Thread(target=self._warm_up, daemon=True).start()
+            # Continue downloads that were interrupted by a crash or quit
+            if any(q.resumed for q in self.queue.with_status(QueueItem.STATUS_PENDING)):
+                self._start_download()
+
+    def _warm_up(self):
+        try:
+            self.downloader.warm_up()
+            warm_imports()
+            _startup.mark("warm_up")
+        except Exception:
+            log.error(f"Warm-up failed: {traceback.format_exc()}")
+
+    def _on_close(self):
+        log.info(f"Startup timings: {_startup.report(STARTUP_REPORT)}")
+        self._closing = True
+        self.pool.cancel_all()
+        self.postprocess.shutdown(wait=False)
+        self.enricher.close()
+        self.thumbnails.shutdown()
+        self.journal.close()
+        self._export_metrics()
+        self.downloader.close()
+        self.destroy()
 
     # ── IME clipboard fix (Korean, Japanese, etc.) ────────────────────
 
@@ -158,6 +240,7 @@ class App(ctk.CTk):
         self.url_entry = ctk.CTkEntry(url_frame, placeholder_text="YouTube URL을 입력하세요")
         self.url_entry.pack(side="left", fill="x", expand=True, padx=(0, 8))
         self.url_entry.bind("<Return>", lambda _: self._fetch_info())
+        self.url_entry.bind("<Shift-Return>", lambda _: self._fetch_info(refresh=True))
 
         self.fetch_btn = ctk.CTkButton(url_frame, text="정보 조회", width=100, command=self._fetch_info)
         self.fetch_btn.pack(side="right")
@@ -203,6 +286,45 @@ class App(ctk.CTk):
         self.quality_menu.pack(side="left")
         self.quality_menu.set(VIDEO_QUALITY_LABELS["720"])
 
+        self.workers_menu = ctk.CTkOptionMenu(
+            qual_frame, width=70, values=[str(n) for n in range(1, MAX_WORKERS + 1)],
+        )
+        self.workers_menu.pack(side="right")
+        self.workers_menu.set(str(DEFAULT_WORKERS))
+        ctk.CTkLabel(qual_frame, text="동시 다운로드:").pack(side="right", padx=(0, 8))
+
+        # Applies to the next item a worker starts, also mid-run
+        self.order_menu = ctk.CTkOptionMenu(
+            qual_frame, width=130, values=list(ORDER_LABELS),
+            command=lambda label: setattr(self.pool, "schedule", SCHEDULES[ORDER_LABELS[label]]()),
+        )
+        self.order_menu.pack(side="right", padx=(0, 16))
+        self.order_menu.set("추가 순서")
+        ctk.CTkLabel(qual_frame, text="순서:").pack(side="right", padx=(0, 8))
+
+        # Bandwidth limit (applies live) and priority for newly added items
+        limit_frame = ctk.CTkFrame(self, fg_color="transparent")
+        limit_frame.pack(fill="x", padx=20, pady=(0, 4))
+
+        ctk.CTkLabel(limit_frame, text="속도 제한:").pack(side="left", padx=(0, 8))
+        self.limit_menu = ctk.CTkOptionMenu(
+            limit_frame, width=120, values=list(RATE_LIMITS),
+            command=lambda label: self.bandwidth.set_limit(RATE_LIMITS[label]),
+        )
+        self.limit_menu.pack(side="left")
+
+        # Off by default: each entry costs a full extraction on top of the
+        # download's own (same as the CLI's --enrich)
+        self.enrich_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            limit_frame, text="길이/크기 미리 확인", variable=self.enrich_var, command=self._on_enrich_toggle,
+        ).pack(side="left", padx=(16, 0))
+
+        self.priority_menu = ctk.CTkOptionMenu(limit_frame, width=80, values=list(PRIORITY_LABELS))
+        self.priority_menu.pack(side="right")
+        self.priority_menu.set("보통")
+        ctk.CTkLabel(limit_frame, text="우선순위:").pack(side="right", padx=(0, 8))
+
         # Output directory
         dir_frame = ctk.CTkFrame(self, fg_color="transparent")
         dir_frame.pack(fill="x", padx=20, pady=(0, 8))
@@ -256,11 +378,13 @@ class App(ctk.CTk):
         self.clear_done_btn = ctk.CTkButton(queue_header, text="이력 지우기", width=90, height=28, command=self._clear_done)
         self.clear_done_btn.pack(side="right")
 
-        self.queue_frame = ctk.CTkScrollableFrame(self, height=200)
-        self.queue_frame.pack(fill="both", expand=True, padx=20, pady=(0, 14))
+        self.queue_summary = ctk.CTkLabel(queue_header, text="", text_color="gray")
+        self.queue_summary.pack(side="right", padx=(0, 10))
 
-        self.queue_placeholder = ctk.CTkLabel(self.queue_frame, text="큐가 비어 있습니다", text_color="gray")
-        self.queue_placeholder.pack(pady=20)
+        self.queue_view = QueueListView(
+            self, self.queue, on_remove=self._remove_item, on_cancel=self.pool.cancel, height=200,
+        )
+        self.queue_view.pack(fill="both", expand=True, padx=20, pady=(0, 14))
 
     # ── Format Change ────────────────────────────────────────────────
 
@@ -293,7 +417,8 @@ class App(ctk.CTk):
 
     # ── Fetch Info ───────────────────────────────────────────────────
 
-    def _fetch_info(self):
+    def _fetch_info(self, refresh: bool = False):
+        """Fetch metadata for the entered URL; refresh=True bypasses the cache."""
         url = self.url_entry.get().strip()
         if not url:
             self._set_status("URL을 입력하세요", "orange")
@@ -308,13 +433,16 @@ class App(ctk.CTk):
         def _work():
             try:
                 log.info(f"Fetching info: {url}")
-                info = self.downloader.fetch_info(url)
-                log.info(f"Info OK: {info.title}")
+                # Playlists return after the first page; entries stream in on enqueue
+                info = self.downloader.fetch_info(url, refresh=refresh, entries=False)
+                _startup.mark("first_fetch")
+                log.info(f"Info OK: {info.title} cache={self.downloader.cache.stats()}")
                 self.current_info = info
                 self.after(0, lambda: self._display_info(info))
             except Exception as e:
                 log.error(f"Fetch failed: {traceback.format_exc()}")
-                self.after(0, lambda: self._set_status(f"조회 실패: {e}", "red"))
+                err = str(e)
+                self.after(0, lambda: self._set_status(f"조회 실패: {err}", "red"))
                 self.after(0, lambda: self.title_label.configure(text="조회 실패"))
             finally:
                 self.after(0, lambda: self.fetch_btn.configure(state="normal"))
@@ -325,7 +453,8 @@ class App(ctk.CTk):
         if info.is_playlist:
             self.title_label.configure(text=f"[재생목록] {info.title}")
             self.channel_label.configure(text=f"채널: {info.channel}")
-            self.duration_label.configure(text=f"영상 수: {info.playlist_count}개")
+            count = f"{info.playlist_count}개" if info.playlist_count else "불러오기 전"
+            self.duration_label.configure(text=f"영상 수: {count}")
         else:
             self.title_label.configure(text=info.title)
             self.channel_label.configure(text=f"채널: {info.channel}")
@@ -335,18 +464,15 @@ class App(ctk.CTk):
 
         # Load thumbnail in background
         if info.thumbnail:
-            threading.Thread(target=self._load_thumbnail, args=(info.thumbnail,), daemon=True).start()
+            self.thumbnails.request(
+                info.thumbnail, THUMB_SIZE, key=info.id or None,
+                callback=lambda img: self.after(0, lambda: self._show_thumbnail(info, img)),
+            )
 
-    def _load_thumbnail(self, url: str):
-        try:
-            data = urlopen(url, timeout=10).read()
-            img = Image.open(io.BytesIO(data))
-            img = img.resize((192, 108), Image.LANCZOS)
-            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=(192, 108))
-            self.after(0, lambda: self.thumb_label.configure(image=ctk_img, text=""))
-            self._thumb_ref = ctk_img  # prevent GC
-        except Exception:
-            pass
+    def _show_thumbnail(self, info: VideoInfo, img: ctk.CTkImage):
+        # Ignore late results for a video that is no longer displayed
+        if self.current_info is info:
+            self.thumb_label.configure(image=img, text="")
 
     # ── Queue Management ─────────────────────────────────────────────
 
@@ -359,57 +485,137 @@ class App(ctk.CTk):
         info = self.current_info
         fmt = self.format_var.get()
         quality = self._get_quality_key()
+        priority = PRIORITY_LABELS[self.priority_menu.get()]
 
         if info and info.is_playlist:
-            for entry in info.entries:
-                entry_url = entry.get("url") or entry.get("webpage_url", "")
-                entry_title = entry.get("title", "Unknown")
-                if entry_url:
-                    self.queue.append(QueueItem(entry_url, entry_title, fmt, quality))
-        else:
-            title = info.title if info else url
-            self.queue.append(QueueItem(url, title, fmt, quality))
+            if info.entries:
+                self._enqueue_entries(info.entries, fmt, quality, priority, url)
+            else:
+                self._stream_playlist(info.url or url, fmt, quality, priority)
+            return
 
-        self._refresh_queue_ui()
-        self._set_status(f"큐에 추가됨 (총 {len(self.queue)}개)", "#28a745")
+        title = info.title if info else url
+        self._enqueue_items([QueueItem(url, title, fmt, quality, info=info, priority=priority)])
 
-    def _refresh_queue_ui(self):
-        for widget in self.queue_frame.winfo_children():
-            widget.destroy()
+    def _stream_playlist(self, url: str, fmt: str, quality: str, priority: int):
+        """Enumerate a playlist in the background, enqueueing entries in batches.
 
-        if not self.queue:
-            ctk.CTkLabel(self.queue_frame, text="큐가 비어 있습니다", text_color="gray").pack(pady=20)
-            return
+        The pool is told a producer is active, so downloads already running
+        keep picking up new entries until enumeration finishes.
+        """
+        self.pool.begin_producer()
+        self._set_status("재생목록 불러오는 중...", "gray")
 
-        for i, item in enumerate(self.queue):
-            row = ctk.CTkFrame(self.queue_frame, fg_color="transparent")
-            row.pack(fill="x", pady=1)
+        def _work():
+            batch: list[dict] = []
+            last_flush = time.monotonic()
+            try:
+                for entry in self.downloader.iter_entries(url):
+                    batch.append(entry)
+                    if len(batch) >= PLAYLIST_BATCH or time.monotonic() - last_flush > 0.5:
+                        self.after(
+                            0, lambda b=batch: self._enqueue_entries(b, fmt, quality, priority, url, streaming=True),
+                        )
+                        batch = []
+                        last_flush = time.monotonic()
+                if batch:
+                    self.after(0, lambda b=batch: self._enqueue_entries(b, fmt, quality, priority, url))
+            except Exception as e:
+                log.error(f"Playlist enumeration failed: {traceback.format_exc()}")
+                err = str(e)
+                self.after(0, lambda: self._set_status(f"재생목록 조회 실패: {err}", "red"))
+            finally:
+                # Queued after the last batch, so workers see every entry first
+                self.after(0, self.pool.end_producer)
 
-            if item.status == QueueItem.STATUS_DONE:
-                icon, color = "✅", "#28a745"
-            elif item.status == QueueItem.STATUS_DOWNLOADING:
-                icon, color = "⏳", "#ffc107"
-            elif item.status == QueueItem.STATUS_ERROR:
-                icon, color = "❌", "#dc3545"
-            else:
-                icon, color = "⏸", "gray"
+        threading.Thread(target=_work, daemon=True).start()
 
-            ctk.CTkLabel(row, text=f"{i + 1}.", width=30).pack(side="left")
-            title_text = item.title
-            if item.status == QueueItem.STATUS_ERROR and item.error_msg:
-                title_text += f"\n  >> {item.error_msg}"
-            ctk.CTkLabel(row, text=title_text, anchor="w", wraplength=500, justify="left").pack(side="left", fill="x", expand=True)
-            ctk.CTkLabel(row, text=icon, text_color=color, width=30).pack(side="right", padx=(4, 0))
+    def _enqueue_entries(
+        self, entries: list[dict], fmt: str, quality: str, priority: int, source: str, streaming: bool = False,
+    ):
+        self._enqueue_items(
+            [
+                QueueItem(
+                    entry.get("url") or entry.get("webpage_url", ""), entry.get("title", "Unknown"), fmt, quality,
+                    video_id=entry.get("id", ""), extractor=entry.get("ie_key", ""), priority=priority,
+                    source=source,
+                )
+                for entry in entries
+            ],
+            streaming=streaming,
+        )
 
-            if item.status != QueueItem.STATUS_DOWNLOADING:
-                def _remove(idx=i):
-                    self.queue.pop(idx)
-                    self._refresh_queue_ui()
-                ctk.CTkButton(row, text="✕", width=28, height=28, fg_color="#dc3545", hover_color="#c82333", command=_remove).pack(side="right", padx=2)
+    def _enqueue_items(self, items: list[QueueItem], streaming: bool = False):
+        start = len(self.queue)
+        skipped = 0
+        for item in items:
+            if not item.url:
+                continue
+            if self.archive.contains_item(item):
+                skipped += 1
+                continue
+            self._enqueue(item)
+        self.pool.notify_items()
+        # Flat playlist entries arrive with a title only; resolve the rest in the background
+        if self.enrich_var.get():
+            self.enricher.submit(self.queue[start:], start)
+
+        self._refresh_queue_ui()
+        status = f"큐에 추가됨 (총 {len(self.queue)}개)"
+        if skipped:
+            status += f", 이미 받은 {skipped}개 건너뜀"
+        if streaming:
+            status += " — 재생목록 불러오는 중..."
+        self._set_status(status, "#28a745")
+
+    def _enqueue(self, item: QueueItem):
+        self.queue.append(item)
+        self.journal.add(item)
+
+    def _refresh_queue_ui(self):
+        self.queue_view.refresh()
+        self._update_queue_summary()
+
+    def _on_enrich_toggle(self):
+        if self.enrich_var.get():
+            self.enricher.submit(self.queue, 0)
+        else:
+            self.enricher.clear()
+
+    def _on_enriched(self, item: QueueItem):
+        """Called on an enrichment thread; coalesces the summary refresh per frame."""
+        self.after(0, lambda: self.queue_view.update_item(item))
+        if not self._summary_scheduled:
+            self._summary_scheduled = True
+            self.after(1000 // DEFAULT_FPS, self._update_queue_summary)
+
+    def _update_queue_summary(self):
+        self._summary_scheduled = False
+        pending_items = self.queue.with_status(QueueItem.STATUS_PENDING)
+        seconds, size, known = queue_estimate(pending_items)
+        pending = len(pending_items)
+        if not known:
+            self.queue_summary.configure(text="")
+            return
+        text = f"대기 {format_duration(seconds)}"
+        if size:
+            text += f", 약 {format_size(size)}"
+        if known < pending:
+            text += f" ({known}/{pending}개 확인)"
+        self.queue_summary.configure(text=text)
+
+    def _remove_item(self, item: QueueItem):
+        self.enricher.cancel(item)
+        self.queue.remove(item)
+        self.journal.remove(item)
+        self._refresh_queue_ui()
 
     def _clear_done(self):
         """Remove completed and errored items from queue."""
-        self.queue = [q for q in self.queue if q.status in (QueueItem.STATUS_PENDING, QueueItem.STATUS_DOWNLOADING)]
+        active = (QueueItem.STATUS_PENDING, QueueItem.STATUS_DOWNLOADING)
+        # In place: the download pool reads this same store
+        for q in self.queue.retain(lambda q: q.status in active):
+            self.journal.remove(q)
         self._refresh_queue_ui()
         self.progress_bar.set(0)
         self.progress_pct.configure(text="0%")
@@ -419,11 +625,9 @@ class App(ctk.CTk):
 
     def _start_download(self):
         # If no pending items, try adding current URL
-        pending = [q for q in self.queue if q.status == QueueItem.STATUS_PENDING]
-        if not pending:
+        if not self.queue.count(QueueItem.STATUS_PENDING):
             self._add_to_queue()
-        pending = [q for q in self.queue if q.status == QueueItem.STATUS_PENDING]
-        if not pending:
+        if not self.queue.count(QueueItem.STATUS_PENDING) and not self.pool.has_producers:
             return
 
         self.is_downloading = True
@@ -431,57 +635,47 @@ class App(ctk.CTk):
         self.cancel_btn.configure(state="normal")
         self.add_queue_btn.configure(state="disabled")
 
-        threading.Thread(target=self._download_worker, daemon=True).start()
-
-    def _download_worker(self):
-        for item in self.queue:
-            if item.status != QueueItem.STATUS_PENDING:
-                continue
-
-            item.status = QueueItem.STATUS_DOWNLOADING
-            self.after(0, self._refresh_queue_ui)
-            self.after(0, lambda t=item.title: self._set_status(f"다운로드 중: {t}", "#ffc107"))
+        self.pool.workers = int(self.workers_menu.get())
+        self.pool.start(
+            self.queue,
+            self.output_dir,
+            on_update=self._on_pool_update,
+            on_progress=lambda item, d: self.progress.publish(id(item), d),
+            on_finished=lambda: self.after(0, self._download_finished),
+        )
 
-            try:
-                log.info(f"Downloading: {item.url} fmt={item.fmt} quality={item.quality} dir={self.output_dir}")
-                self.downloader.download(
-                    url=item.url,
-                    output_dir=self.output_dir,
-                    fmt=item.fmt,
-                    quality=item.quality,
-                    progress_callback=lambda d: self.after(0, lambda d=d: self._on_progress(d)),
-                )
-                item.status = QueueItem.STATUS_DONE
-                log.info(f"Download OK: {item.title}")
-            except Exception as e:
-                item.status = QueueItem.STATUS_ERROR
-                item.error_msg = str(e)
-                err = str(e)
-                log.error(f"Download failed: {item.url}\n{traceback.format_exc()}")
-                if "Cancelled" in err:
-                    self.after(0, lambda: self._set_status("다운로드 취소됨", "orange"))
-                    break
-                self.after(0, lambda err=err: self._set_status(f"실패: {err}", "red"))
-
-            self.after(0, self._refresh_queue_ui)
-
-        self.after(0, self._download_finished)
-
-    def _on_progress(self, d: dict):
-        if d.get("status") == "downloading":
-            total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
-            downloaded = d.get("downloaded_bytes", 0)
-            if total > 0:
-                pct = downloaded / total
-                self.progress_bar.set(pct)
-                self.progress_pct.configure(text=f"{int(pct * 100)}%")
-            speed = d.get("speed")
-            if speed:
-                speed_str = f"{speed / 1024 / 1024:.1f} MB/s"
-                self._set_status(f"다운로드 중... {speed_str}", "#ffc107")
-        elif d.get("status") == "finished":
-            self.progress_bar.set(1.0)
-            self.progress_pct.configure(text="100%")
+    def _on_pool_update(self, item: QueueItem):
+        """Called on a worker thread whenever an item changes status."""
+        if self._closing:
+            # Items cancelled by quitting stay resumable, and the window is going away
+            return
+        self.journal.update(item)
+        if item.status != QueueItem.STATUS_DOWNLOADING or item.post_status:
+            self.progress.finish(id(item))
+        self.after(0, lambda: self._on_item_update(item))
+
+    def _on_item_update(self, item: QueueItem):
+        self.queue_view.update_item(item)
+        if item.post_status == QueueItem.POST_RUNNING and item.status == QueueItem.STATUS_DOWNLOADING:
+            self._set_status(f"변환 중: {item.title}", "#17a2b8")
+        elif item.status == QueueItem.STATUS_DOWNLOADING and not item.post_status:
+            self._set_status(f"다운로드 중: {item.title}", "#ffc107")
+        elif item.status == QueueItem.STATUS_ERROR:
+            self._set_status(f"실패: {item.error_msg}", "red")
+        elif item.status == QueueItem.STATUS_CANCELLED:
+            self._set_status("다운로드 취소됨", "orange")
+
+    def _poll_progress(self):
+        """Apply at most one coalesced progress update per frame."""
+        snap = self.progress.drain()
+        if snap is not None and snap.active:
+            self.progress_bar.set(snap.fraction)
+            self.progress_pct.configure(text=f"{int(snap.fraction * 100)}%")
+            if snap.speed:
+                speed_str = f"{snap.speed / 1024 / 1024:.1f} MB/s"
+                eta_str = f", 남은 시간 {_format_eta(snap.eta)}" if snap.eta is not None else ""
+                self._set_status(f"다운로드 중 ({snap.active}개)... {speed_str}{eta_str}", "#ffc107")
+        self.after(1000 // DEFAULT_FPS, self._poll_progress)
 
     def _download_finished(self):
         self.is_downloading = False
@@ -489,13 +683,35 @@ class App(ctk.CTk):
         self.cancel_btn.configure(state="disabled")
         self.add_queue_btn.configure(state="normal")
 
-        done = sum(1 for q in self.queue if q.status == QueueItem.STATUS_DONE)
-        errors = sum(1 for q in self.queue if q.status == QueueItem.STATUS_ERROR)
+        done = self.queue.count(QueueItem.STATUS_DONE)
+        errors = self.queue.count(QueueItem.STATUS_ERROR)
         total = len(self.queue)
-        self._set_status(f"완료: {done}/{total} 성공, {errors} 실패", "#28a745" if errors == 0 else "orange")
+        stats = self.pool.stats()
+        avg = stats["avg_speed"] / 1024 / 1024
+        log.info(
+            f"Run finished: {stats['schedule']} order, mean completion {stats['mean_completion']:.1f}s, "
+            f"predicted within {stats['completion_error']:.1f}s"
+        )
+        self._set_status(
+            f"완료: {done}/{total} 성공, {errors} 실패 (평균 {avg:.1f} MB/s, 평균 완료 {stats['mean_completion']:.0f}초)",
+            "#28a745" if errors == 0 else "orange",
+        )
+        self.progress.clear()
+        self.progress_bar.set(1.0 if done else 0)
+        self.progress_pct.configure(text="100%" if done else "0%")
+        self._refresh_queue_ui()
+        self._export_metrics()
+
+    def _export_metrics(self):
+        """Write per-phase timing histograms as JSON and a Prometheus textfile."""
+        try:
+            self.metrics.write_json(METRICS_JSON)
+            self.metrics.write_prometheus(METRICS_PROM)
+        except OSError:
+            log.warning(f"Could not write metrics: {traceback.format_exc()}")
 
     def _cancel_download(self):
-        self.downloader.cancel()
+        self.pool.cancel_all()
 
     # ── Helpers ───────────────────────────────────────────────────────
 
@@ -503,6 +719,15 @@ class App(ctk.CTk):
         self.status_label.configure(text=text, text_color=color)
 
 
+def _format_eta(seconds: float) -> str:
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    if h > 0:
+        return f"{h}:{m:02d}:{s:02d}"
+    return f"{m}:{s:02d}"
+
+
 if __name__ == "__main__":
+    _setup_logging()
     app = App()
     app.mainloop()
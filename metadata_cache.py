@@ -0,0 +1,174 @@
+"""Two-tier (memory + SQLite) cache for fetched video/playlist metadata."""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+DEFAULT_TTL = 6 * 3600
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 5000
+
+_YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com")
+
+
+def cache_key(url: str) -> str:
+    """Normalize a URL into a cache key.
+
+    YouTube URLs collapse to their video or playlist id so that different
+    spellings of the same link (youtu.be, shorts, extra tracking params)
+    share one entry. Other URLs are normalized by host case and query order.
+    """
+    url = url.strip()
+    parts = urlsplit(url if "://" in url else f"https://{url}")
+    host = parts.netloc.lower()
+    query = parse_qs(parts.query)
+    path = parts.path.rstrip("/")
+
+    if host in _YOUTUBE_HOSTS:
+        # yt-dlp treats watch?v=..&list=.. as the playlist unless noplaylist is set
+        if "list" in query:
+            return f"youtube:playlist:{query['list'][0]}"
+        if "v" in query:
+            return f"youtube:video:{query['v'][0]}"
+        for prefix in ("/shorts/", "/embed/", "/live/"):
+            if path.startswith(prefix):
+                return f"youtube:video:{path[len(prefix):]}"
+    elif host == "youtu.be" and path:
+        if "list" in query:
+            return f"youtube:playlist:{query['list'][0]}"
+        return f"youtube:video:{path[1:]}"
+
+    normalized_query = urlencode(sorted(parse_qs(parts.query, keep_blank_values=True).items()), doseq=True)
+    return urlunsplit((parts.scheme.lower(), host, path, normalized_query, ""))
+
+
+class MetadataCache:
+    """LRU metadata cache with TTL, backed by an optional SQLite file.
+
+    Values are plain dicts (see VideoInfo.to_dict). The memory tier holds the
+    most recently used entries; the disk tier survives restarts and is bounded
+    separately. Both tiers evict the least recently accessed entry first.
+    """
+
+    def __init__(
+        self,
+        disk_path: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        disk_entries: int = DEFAULT_DISK_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path is not None:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "key TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed_at)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached value for `key`, or None on a miss or expiry."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                stored_at, value = cached
+                if now - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT data, stored_at FROM metadata WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    blob, stored_at = row
+                    if now - stored_at <= self.ttl:
+                        value = json.loads(zlib.decompress(blob))
+                        self._db.execute("UPDATE metadata SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, stored_at, value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM metadata WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        """Store `value` in both tiers, evicting the oldest entries if full."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is None:
+                return
+            blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+            self._db.execute(
+                "INSERT OR REPLACE INTO metadata (key, data, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, now, now),
+            )
+            overflow = self._db.execute("SELECT COUNT(*) FROM metadata").fetchone()[0] - self.disk_entries
+            if overflow > 0:
+                self._db.execute(
+                    "DELETE FROM metadata WHERE key IN "
+                    "(SELECT key FROM metadata ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+            self._db.commit()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM metadata WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM metadata")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, stored_at: float, value: dict):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,286 @@
+"""Per-job phase timings and throughput, aggregated into histograms.
+
+Downloader opens a JobMetrics for every fetch and download; the yt-dlp
+session moves it between phases as extraction, format selection, the
+transfer and ffmpeg run (see segmented.SegmentedYoutubeDL). Finished jobs
+are folded into a Metrics collector, which exports JSON and the Prometheus
+textfile format (for node_exporter's textfile collector).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+PHASE_EXTRACT = "extract"
+PHASE_FORMAT = "format_select"
+PHASE_TRANSFER = "transfer"
+PHASE_MERGE = "merge"
+PHASE_POSTPROCESS = "postprocess"
+PHASES = (PHASE_EXTRACT, PHASE_FORMAT, PHASE_TRANSFER, PHASE_MERGE, PHASE_POSTPROCESS)
+
+KIND_FETCH = "fetch"
+KIND_DOWNLOAD = "download"
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+SPEED_BUCKETS = tuple(2 ** n * 1024 for n in range(6, 18, 2))  # 64 KiB/s .. 64 MiB/s
+RECENT_JOBS = 100
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds observations <= buckets[i]."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        total, out = 0, []
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": dict(zip((str(b) for b in self.buckets), self.cumulative())),
+            "sum": round(self.sum, 3),
+            "count": self.count,
+        }
+
+
+class JobMetrics:
+    """Timings of one fetch or download.
+
+    Phases are sequential: enter() closes the current phase and starts the
+    next; time spent in a phase entered twice adds up. on_progress() takes
+    yt-dlp progress dicts and counts bytes moved in this run (a resumed
+    .part's existing bytes are not counted) and the peak reported speed.
+    """
+
+    def __init__(self, collector: "Metrics", kind: str, url: str):
+        self.collector = collector
+        self.kind = kind
+        self.url = url
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.phases: dict[str, float] = {}
+        self.bytes = 0
+        self.retries = 0
+        self.peak_speed = 0.0
+        self.ok: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._phase: Optional[str] = None
+        self._phase_started = 0.0
+        self._seen: dict[str, int] = {}
+
+    def enter(self, phase: str):
+        with self._lock:
+            self._close_phase()
+            self._phase = phase
+            self._phase_started = time.perf_counter()
+
+    def pause(self):
+        """Close the current phase without starting another (e.g. queued for ffmpeg)."""
+        with self._lock:
+            self._close_phase()
+            self._phase = None
+
+    def retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def on_progress(self, d: dict):
+        if d.get("status") != "downloading":
+            return
+        key = d.get("tmpfilename") or d.get("filename", "")
+        downloaded = d.get("downloaded_bytes") or 0
+        with self._lock:
+            if key in self._seen:
+                delta = downloaded - self._seen[key]
+            else:
+                # yt-dlp's speed and elapsed cover this run only, which
+                # excludes a resumed .part's existing bytes
+                delta = min(downloaded, int((d.get("speed") or 0) * (d.get("elapsed") or 0)))
+            if key not in self._seen or delta > 0:
+                self._seen[key] = downloaded
+            if delta > 0:
+                self.bytes += delta
+            self.peak_speed = max(self.peak_speed, d.get("speed") or 0.0)
+
+    @property
+    def avg_speed(self) -> float:
+        """Bytes per second over the transfer phase (whole job if it had none)."""
+        seconds = self.phases.get(PHASE_TRANSFER) or self.elapsed
+        return self.bytes / seconds if seconds > 0 else 0.0
+
+    def finish(self, ok: bool = True):
+        """Close the job and hand it to the collector. Later calls are ignored."""
+        with self._lock:
+            if self.ok is not None:
+                return
+            self._close_phase()
+            self._phase = None
+            self.ok = ok
+            self.elapsed = time.perf_counter() - self.started
+        self.collector.record(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "url": self.url,
+            "ok": self.ok,
+            "elapsed": round(self.elapsed, 3),
+            "phases": {k: round(v, 3) for k, v in self.phases.items()},
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "avg_speed": round(self.avg_speed),
+            "peak_speed": round(self.peak_speed),
+        }
+
+    def _close_phase(self):
+        if self._phase is not None:
+            spent = time.perf_counter() - self._phase_started
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + spent
+
+
+class Metrics:
+    """Thread-safe aggregate of finished jobs, keyed by job kind."""
+
+    def __init__(self, recent: int = RECENT_JOBS):
+        self._lock = threading.Lock()
+        self._jobs: dict[tuple[str, str], int] = {}
+        self._durations: dict[str, Histogram] = {}
+        self._phases: dict[tuple[str, str], Histogram] = {}
+        self._avg_speed = Histogram(SPEED_BUCKETS)
+        self._peak_speed = Histogram(SPEED_BUCKETS)
+        self._bytes = 0
+        self._retries = 0
+        self.recent: deque = deque(maxlen=recent)
+
+    def job(self, kind: str, url: str) -> JobMetrics:
+        return JobMetrics(self, kind, url)
+
+    @contextmanager
+    def track(self, kind: str, url: str):
+        """Time a with-block as a new job, starting in the extract phase."""
+        job = self.job(kind, url)
+        job.enter(PHASE_EXTRACT)
+        with self.track_job(job):
+            yield job
+
+    @staticmethod
+    @contextmanager
+    def track_job(job: JobMetrics):
+        """Finish `job` when the with-block exits, as failed if it raised."""
+        try:
+            yield job
+        except BaseException:
+            job.finish(ok=False)
+            raise
+        job.finish()
+
+    def record(self, job: JobMetrics):
+        result = "ok" if job.ok else "error"
+        with self._lock:
+            self._jobs[(job.kind, result)] = self._jobs.get((job.kind, result), 0) + 1
+            self._durations.setdefault(job.kind, Histogram()).observe(job.elapsed)
+            for phase, seconds in job.phases.items():
+                self._phases.setdefault((job.kind, phase), Histogram()).observe(seconds)
+            self._bytes += job.bytes
+            self._retries += job.retries
+            if job.kind == KIND_DOWNLOAD and job.ok and job.bytes:
+                self._avg_speed.observe(job.avg_speed)
+                self._peak_speed.observe(job.peak_speed)
+            self.recent.append(job.to_dict())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "time": time.time(),
+                "jobs": {f"{kind}:{result}": n for (kind, result), n in sorted(self._jobs.items())},
+                "bytes": self._bytes,
+                "retries": self._retries,
+                "duration_seconds": {kind: h.to_dict() for kind, h in sorted(self._durations.items())},
+                "phase_seconds": {
+                    f"{kind}:{phase}": h.to_dict() for (kind, phase), h in sorted(self._phases.items())
+                },
+                "avg_speed_bytes": self._avg_speed.to_dict(),
+                "peak_speed_bytes": self._peak_speed.to_dict(),
+                "recent": list(self.recent),
+            }
+
+    def write_json(self, path: Path):
+        _write_atomic(path, json.dumps(self.snapshot(), indent=1))
+
+    def write_prometheus(self, path: Path):
+        """Write the textfile-collector format; the file is replaced atomically."""
+        _write_atomic(path, self.prometheus())
+
+    def prometheus(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            lines += [
+                "# HELP ytdl_jobs_total Finished jobs by kind and result.",
+                "# TYPE ytdl_jobs_total counter",
+            ]
+            for (kind, result), n in sorted(self._jobs.items()):
+                lines.append(f'ytdl_jobs_total{{kind="{kind}",result="{result}"}} {n}')
+            lines += [
+                "# HELP ytdl_bytes_total Bytes transferred by finished jobs.",
+                "# TYPE ytdl_bytes_total counter",
+                f"ytdl_bytes_total {self._bytes}",
+                "# HELP ytdl_retries_total Retried requests, fragments and ranges.",
+                "# TYPE ytdl_retries_total counter",
+                f"ytdl_retries_total {self._retries}",
+            ]
+            _histogram_lines(lines, "ytdl_job_seconds", "Job wall time.", {
+                (("kind", kind),): h for kind, h in sorted(self._durations.items())
+            })
+            _histogram_lines(lines, "ytdl_phase_seconds", "Time spent per job phase.", {
+                (("kind", kind), ("phase", phase)): h for (kind, phase), h in sorted(self._phases.items())
+            })
+            _histogram_lines(lines, "ytdl_avg_speed_bytes", "Average transfer rate per download.", {
+                (): self._avg_speed,
+            })
+            _histogram_lines(lines, "ytdl_peak_speed_bytes", "Peak transfer rate per download.", {
+                (): self._peak_speed,
+            })
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(lines: list[str], name: str, help_text: str, series: dict[tuple, Histogram]):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, h in series.items():
+        base = ",".join(f'{k}="{v}"' for k, v in labels)
+        sep = "," if base else ""
+        for bound, count in zip(h.buckets, h.cumulative()):
+            lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{base}{sep}le="+Inf"}} {h.count}')
+        suffix = f"{{{base}}}" if base else ""
+        lines.append(f"{name}_sum{suffix} {h.sum:.3f}")
+        lines.append(f"{name}_count{suffix} {h.count}")
+
+
+def _write_atomic(path: Path, text: str):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
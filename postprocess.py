@@ -0,0 +1,63 @@
+"""Post-processing (ffmpeg merge / audio extraction) as its own pipeline stage."""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+log = logging.getLogger("ytdl")
+
+
+def default_workers() -> int:
+    """Half the cores, leaving the rest for downloads and the UI."""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+class PostProcessStage:
+    """Runs deferred post-processing jobs on a bounded set of ffmpeg workers.
+
+    Each worker thread drives one ffmpeg process at a time, and ffmpeg is
+    told to use a single thread (see Downloader.download), so `workers`
+    caps the cores spent on post-processing. Jobs wait in a FIFO queue.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or default_workers()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ffmpeg")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running."""
+        return self._pending
+
+    def submit(
+        self,
+        job: Callable[[], None],
+        on_start: Optional[Callable[[], None]] = None,
+        on_done: Optional[Callable[[Optional[Exception]], None]] = None,
+    ):
+        """Queue `job`. on_start/on_done(error) run on the worker thread."""
+        with self._lock:
+            self._pending += 1
+        self._executor.submit(self._run, job, on_start, on_done)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, on_start, on_done):
+        error: Optional[Exception] = None
+        try:
+            if on_start:
+                on_start()
+            job()
+        except Exception as e:
+            log.exception("Post-processing failed")
+            error = e
+        finally:
+            with self._lock:
+                self._pending -= 1
+        if on_done:
+            on_done(error)
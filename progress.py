@@ -0,0 +1,104 @@
+"""Coalescing progress pipeline between download workers and the UI thread."""
+
+import threading
+import time
+from typing import Hashable, Optional
+
+DEFAULT_FPS = 15
+SPEED_SMOOTHING = 0.3  # EMA weight of the newest speed sample
+
+
+class _JobSlot:
+    """Latest progress state of one job plus its smoothed speed."""
+
+    __slots__ = ("status", "downloaded", "total", "raw_speed", "speed", "filename", "updated_at", "dirty")
+
+    def __init__(self):
+        self.status = ""
+        self.downloaded = 0
+        self.total = 0
+        self.raw_speed = 0.0
+        self.speed = 0.0
+        self.filename = ""
+        self.updated_at = 0.0
+        self.dirty = False
+
+    @property
+    def eta(self) -> Optional[float]:
+        if self.speed <= 0 or self.total <= 0:
+            return None
+        return max(self.total - self.downloaded, 0) / self.speed
+
+
+class ProgressSnapshot:
+    """Aggregate view of all active jobs, produced once per UI frame."""
+
+    def __init__(self, jobs: dict[Hashable, _JobSlot]):
+        self.jobs = jobs
+        self.active = len(jobs)
+        self.downloaded = sum(s.downloaded for s in jobs.values())
+        self.total = sum(s.total for s in jobs.values())
+        self.speed = sum(s.speed for s in jobs.values())
+        self.fraction = min(self.downloaded / self.total, 1.0) if self.total > 0 else 0.0
+        remaining = max(self.total - self.downloaded, 0)
+        self.eta: Optional[float] = remaining / self.speed if self.speed > 0 and self.total > 0 else None
+
+
+class ProgressHub:
+    """Collects per-chunk progress from workers and hands the UI one update per frame.
+
+    Workers call publish() from any thread; it only overwrites the job's slot
+    under a lock, so it is cheap and never touches the UI. The UI thread calls
+    drain() on a timer and receives at most one ProgressSnapshot per call,
+    or None when nothing changed since the previous frame.
+    """
+
+    def __init__(self, smoothing: float = SPEED_SMOOTHING):
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._slots: dict[Hashable, _JobSlot] = {}
+        self._changed = False
+
+    def publish(self, job: Hashable, d: dict):
+        """Record the latest yt-dlp progress dict for `job`."""
+        with self._lock:
+            slot = self._slots.get(job)
+            if slot is None:
+                slot = self._slots[job] = _JobSlot()
+            if d.get("filename", "") != slot.filename:
+                # Next stream of the same job (e.g. audio after video)
+                slot.filename = d.get("filename", "")
+                slot.speed = 0.0
+            slot.status = d.get("status", "")
+            slot.downloaded = d.get("downloaded_bytes") or 0
+            slot.total = d.get("total_bytes") or d.get("total_bytes_estimate") or slot.total
+            slot.raw_speed = d.get("speed") or 0.0
+            slot.updated_at = time.monotonic()
+            slot.dirty = True
+            self._changed = True
+
+    def finish(self, job: Hashable):
+        """Drop a job once it has completed, failed or been cancelled."""
+        with self._lock:
+            if self._slots.pop(job, None) is not None:
+                self._changed = True
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._changed = True
+
+    def drain(self) -> Optional[ProgressSnapshot]:
+        """Fold pending updates into smoothed state; None if nothing changed."""
+        with self._lock:
+            if not self._changed:
+                return None
+            self._changed = False
+            for slot in self._slots.values():
+                if slot.dirty:
+                    slot.dirty = False
+                    if slot.speed <= 0:
+                        slot.speed = slot.raw_speed
+                    else:
+                        slot.speed += self.smoothing * (slot.raw_speed - slot.speed)
+            return ProgressSnapshot(dict(self._slots))
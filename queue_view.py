@@ -0,0 +1,195 @@
+"""Virtualized download queue list for the CustomTkinter GUI."""
+
+import sys
+from typing import Callable, Optional, Sequence
+
+import customtkinter as ctk
+
+from download_queue import QueueItem
+from enrich import format_duration, format_size
+
+ROW_HEIGHT = 32
+ROW_SPACING = 2
+
+STATUS_ICONS = {
+    QueueItem.STATUS_DONE: ("✅", "#28a745"),
+    QueueItem.STATUS_DOWNLOADING: ("⏳", "#ffc107"),
+    QueueItem.STATUS_ERROR: ("❌", "#dc3545"),
+    QueueItem.STATUS_CANCELLED: ("⏹", "orange"),
+    QueueItem.STATUS_PENDING: ("⏸", "gray"),
+}
+POST_ICON = ("⚙", "#17a2b8")
+POST_LABELS = {QueueItem.POST_QUEUED: "변환 대기", QueueItem.POST_RUNNING: "변환 중"}
+
+
+class _Row:
+    """One recycled row of widgets, rebound to whichever item is visible in its slot."""
+
+    def __init__(self, view: "QueueListView", slot: int):
+        self.view = view
+        self.slot = slot
+        self.item: Optional[QueueItem] = None
+        self._rendered: tuple = ()
+
+        self.frame = ctk.CTkFrame(view.body, height=ROW_HEIGHT, fg_color="transparent")
+        self.frame.pack_propagate(False)
+        self.index_label = ctk.CTkLabel(self.frame, text="", width=44, anchor="e")
+        self.index_label.pack(side="left", padx=(0, 6))
+        self.icon_label = ctk.CTkLabel(self.frame, text="", width=30)
+        self.icon_label.pack(side="right", padx=(4, 0))
+        self.button = ctk.CTkButton(self.frame, text="✕", width=28, height=28, command=self._on_button)
+        self.button.pack(side="right", padx=2)
+        self.title_label = ctk.CTkLabel(self.frame, text="", anchor="w", justify="left")
+        self.title_label.pack(side="left", fill="x", expand=True)
+
+        for widget in (self.frame, self.index_label, self.title_label, self.icon_label):
+            view.bind_wheel(widget)
+
+    def bind(self, index: int, item: Optional[QueueItem]):
+        """Show `item` (at queue position `index`) in this row, or hide the row."""
+        self.item = item
+        if item is None:
+            if self._rendered:
+                self.frame.place_forget()
+                self._rendered = ()
+            return
+
+        state = (index, item.title, item.status, item.post_status, item.error_msg, item.duration, item.est_size)
+        if state == self._rendered:
+            return
+        if not self._rendered:
+            self.frame.place(x=0, y=self.slot * (ROW_HEIGHT + ROW_SPACING), relwidth=1.0)
+        self._rendered = state
+
+        icon, color = STATUS_ICONS.get(item.status, STATUS_ICONS[QueueItem.STATUS_PENDING])
+        title_text = item.title
+        if item.duration:
+            details = format_duration(item.duration)
+            if item.est_size:
+                details += f", ~{format_size(item.est_size)}"
+            title_text += f"  [{details}]"
+        post_label = POST_LABELS.get(item.post_status) if item.status == QueueItem.STATUS_DOWNLOADING else None
+        if post_label:
+            icon, color = POST_ICON
+            title_text += f"  ({post_label})"
+        if item.status == QueueItem.STATUS_ERROR and item.error_msg:
+            title_text += f"  >> {item.error_msg}"
+        self.index_label.configure(text=f"{index + 1}.")
+        self.title_label.configure(text=title_text)
+        self.icon_label.configure(text=icon, text_color=color)
+        if item.status == QueueItem.STATUS_DOWNLOADING:
+            self.button.configure(text="⏹", fg_color="#6c757d", hover_color="#5a6268")
+        else:
+            self.button.configure(text="✕", fg_color="#dc3545", hover_color="#c82333")
+
+    def _on_button(self):
+        if self.item is None:
+            return
+        if self.item.status == QueueItem.STATUS_DOWNLOADING:
+            self.view.on_cancel(self.item)
+        else:
+            self.view.on_remove(self.item)
+
+
+class QueueListView(ctk.CTkFrame):
+    """Scrollable queue list that only materializes the rows currently visible.
+
+    The view keeps a reference to the live queue list and a fixed pool of row
+    widgets sized to the viewport. Scrolling rebinds rows to different items;
+    status changes reconfigure a single row in place. Cost per refresh is
+    proportional to the number of visible rows, not the queue length.
+    """
+
+    def __init__(
+        self,
+        master,
+        items: Sequence[QueueItem],
+        on_remove: Callable[[QueueItem], None],
+        on_cancel: Callable[[QueueItem], None],
+        **kwargs,
+    ):
+        super().__init__(master, **kwargs)
+        self.items = items
+        self.on_remove = on_remove
+        self.on_cancel = on_cancel
+        self._offset = 0
+        self._rows: list[_Row] = []
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y", padx=(0, 2), pady=4)
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True, padx=6, pady=4)
+        self.placeholder = ctk.CTkLabel(self.body, text="큐가 비어 있습니다", text_color="gray")
+
+        self.bind_wheel(self.body)
+        self.bind_wheel(self.placeholder)
+        self.body.bind("<Configure>", self._on_resize)
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    def refresh(self):
+        """Re-render the visible window after items were added or removed."""
+        total = len(self.items)
+        visible = len(self._rows)
+        self._offset = max(0, min(self._offset, total - visible))
+
+        if total == 0:
+            self.placeholder.place(relx=0.5, y=20, anchor="n")
+        else:
+            self.placeholder.place_forget()
+
+        for slot, row in enumerate(self._rows):
+            index = self._offset + slot
+            row.bind(index, self.items[index] if index < total else None)
+
+        if total > 0 and visible > 0:
+            self.scrollbar.set(self._offset / total, min((self._offset + visible) / total, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def update_item(self, item: QueueItem):
+        """Reconfigure the row showing `item`, if it is currently visible."""
+        for slot, row in enumerate(self._rows):
+            if row.item is item:
+                row.bind(self._offset + slot, item)
+                return
+
+    def scroll_to(self, index: int):
+        self._offset = index
+        self.refresh()
+
+    def bind_wheel(self, widget):
+        if sys.platform.startswith("linux"):
+            widget.bind("<Button-4>", lambda _: self._scroll_units(-1))
+            widget.bind("<Button-5>", lambda _: self._scroll_units(1))
+        else:
+            widget.bind("<MouseWheel>", self._on_wheel)
+
+    # ── Scrolling / sizing ───────────────────────────────────────────
+
+    def _on_resize(self, event):
+        wanted = max(1, event.height // (ROW_HEIGHT + ROW_SPACING))
+        while len(self._rows) < wanted:
+            self._rows.append(_Row(self, len(self._rows)))
+        while len(self._rows) > wanted:
+            self._rows.pop().frame.destroy()
+        self.refresh()
+
+    def _on_wheel(self, event):
+        if sys.platform == "darwin":
+            delta = -event.delta
+        else:
+            delta = -int(event.delta / 120) or (-1 if event.delta > 0 else 1)
+        self._scroll_units(delta)
+
+    def _scroll_units(self, delta: int):
+        self._offset += delta
+        self.refresh()
+
+    def _on_scrollbar(self, action: str, value, unit: str = "units"):
+        if action == "moveto":
+            self._offset = int(float(value) * len(self.items))
+        elif action == "scroll":
+            step = len(self._rows) if unit == "pages" else 1
+            self._offset += int(value) * step
+        self.refresh()
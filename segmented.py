@@ -0,0 +1,322 @@
+"""Multi-connection ranged downloads for progressive (single-file) formats.
+
+yt-dlp fetches fragmented formats concurrently on its own, but a plain
+HTTP file always goes over one sequential connection. SegmentedHttpFD
+splits such files into fixed-size byte ranges and fetches them over
+several connections, writing each range at its offset in the .part file.
+
+Imported lazily (it imports yt_dlp), from downloader._Session.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from yt_dlp import YoutubeDL
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+
+from adaptive import TRANSFER_RETRY_BASE, TRANSFER_RETRY_CAP, backoff_delay
+from metrics import PHASE_FORMAT, PHASE_TRANSFER
+
+log = logging.getLogger("ytdl")
+
+SEGMENT_RETRIES = 3
+STATE_SAVE_INTERVAL = 1.0  # seconds between .segments state writes
+PROGRESS_INTERVAL = 0.25  # seconds between progress hook calls
+
+
+class SegmentedHttpFD(HttpFD):
+    """HttpFD that fetches byte ranges in parallel when the server allows it.
+
+    Uses the standard yt-dlp params: concurrent_fragment_downloads is the
+    connection count, http_chunk_size the range size and buffersize the
+    read/write buffer. Finished ranges are recorded in a "<file>.part.segments"
+    sidecar so an interrupted download resumes without refetching them.
+    Anything it can't handle (no range support, small files, a .part left
+    by a sequential download) falls back to the normal HttpFD.
+
+    `throttle` (a bandwidth.JobThrottle) is charged per block by each
+    connection; progress dicts then carry "throttled" so the caller's hook
+    doesn't charge the same bytes again.
+    """
+
+    FD_NAME = "segmented"
+    throttle = None
+
+    @classmethod
+    def suitable(cls, info: dict, params: dict) -> bool:
+        return (
+            info.get("protocol") in ("http", "https")
+            and not info.get("fragments")
+            and not info.get("requested_formats")
+            and not params.get("external_downloader")
+            and (params.get("concurrent_fragment_downloads") or 1) > 1
+            and bool(params.get("http_chunk_size"))
+        )
+
+    def real_download(self, filename, info_dict):
+        tmpfilename = self.temp_name(filename)
+        state_path = tmpfilename + ".segments"
+        chunk = int(self.params["http_chunk_size"])
+
+        total = self._probe_size(info_dict)
+        if total is None or total <= chunk:
+            return super().real_download(filename, info_dict)
+
+        done: set[int] = set()
+        if os.path.exists(tmpfilename):
+            state = self._load_state(state_path)
+            size = os.path.getsize(tmpfilename)
+            if state is not None and state.get("total") == total and state.get("chunk") == chunk and size == total:
+                done = set(state["done"])
+            elif size == total:
+                # Preallocated by us, but with no usable record of which ranges
+                # arrived (died before the first save, or another chunk size):
+                # its zero-filled gaps can't be told from data, so start over
+                log.info(f"Discarding segmented partial file without usable state: {tmpfilename}")
+                os.remove(tmpfilename)
+            else:
+                # Left by a sequential download; let HttpFD resume it
+                return super().real_download(filename, info_dict)
+        if not done and not os.path.exists(tmpfilename):
+            os.makedirs(os.path.dirname(os.path.abspath(tmpfilename)), exist_ok=True)
+            with open(tmpfilename, "wb") as f:
+                f.truncate(total)
+            # Before any range lands, so a full-size .part always has its state
+            self._save_state(state_path, total, chunk, done)
+
+        ranges = [(start, min(start + chunk, total)) for start in range(0, total, chunk)]
+        return self._download_ranges(filename, tmpfilename, state_path, info_dict, total, chunk, ranges, done)
+
+    # ── Helpers ──────────────────────────────────────────────────────
+
+    def _request(self, info_dict: dict, start: int, end: int):
+        headers = dict(info_dict.get("http_headers") or {})
+        headers["Range"] = f"bytes={start}-{end - 1}"
+        return self.ydl.urlopen(Request(info_dict["url"], headers=headers))
+
+    def _probe_size(self, info_dict: dict):
+        """Total size if the server answers a one-byte range request, else None."""
+        try:
+            with self._request(info_dict, 0, 1) as resp:
+                content_range = resp.headers.get("Content-Range", "")
+                if resp.status != 206 or "/" not in content_range:
+                    return None
+                size = content_range.rsplit("/", 1)[1]
+                return int(size) if size.isdigit() else None
+        except Exception as e:
+            log.info(f"Range probe failed, using a single connection ({e})")
+            return None
+
+    @staticmethod
+    def _load_state(path: str):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_state(path: str, total: int, chunk: int, done: set[int]):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"total": total, "chunk": chunk, "done": sorted(done)}, f)
+        os.replace(tmp, path)
+
+    def _download_ranges(self, filename, tmpfilename, state_path, info_dict, total, chunk, ranges, done):
+        buffer_size = max(int(self.params.get("buffersize") or 1024), 1024)
+        pending: queue.Queue[int] = queue.Queue()
+        for index in range(len(ranges)):
+            if index not in done:
+                pending.put(index)
+
+        lock = threading.Lock()
+        stop = threading.Event()
+        errors: list[Exception] = []
+        downloaded = sum(ranges[i][1] - ranges[i][0] for i in done)
+        resumed_bytes = downloaded
+        throttle = self.throttle
+
+        def _fetch(index: int, f) -> bool:
+            """Fetch one range into `f`. False if stopped before it completed."""
+            nonlocal downloaded
+            start, end = ranges[index]
+            received = 0
+            try:
+                with self._request(info_dict, start, end) as resp:
+                    if resp.status != 206:
+                        raise OSError(f"server ignored range request (HTTP {resp.status})")
+                    f.seek(start)
+                    while received < end - start and not stop.is_set():
+                        block = resp.read(min(buffer_size, end - start - received))
+                        if not block:
+                            raise OSError(f"range {start}-{end} ended after {received} bytes")
+                        f.write(block)
+                        received += len(block)
+                        with lock:
+                            downloaded += len(block)
+                        if throttle is not None:
+                            throttle.consume(len(block))
+            except Exception:
+                with lock:
+                    downloaded -= received
+                raise
+            return received == end - start
+
+        def _worker():
+            with open(tmpfilename, "r+b") as f:
+                while not stop.is_set():
+                    try:
+                        index = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    for attempt in range(SEGMENT_RETRIES + 1):
+                        try:
+                            if _fetch(index, f):
+                                f.flush()
+                                with lock:
+                                    done.add(index)
+                            break
+                        except Exception as e:
+                            if attempt == SEGMENT_RETRIES or stop.is_set():
+                                errors.append(e)
+                                stop.set()
+                                return
+                            if self.ydl.metrics is not None:
+                                self.ydl.metrics.retry()
+                            time.sleep(backoff_delay(attempt, TRANSFER_RETRY_BASE, TRANSFER_RETRY_CAP))
+
+        connections = min(int(self.params["concurrent_fragment_downloads"]), pending.qsize())
+        threads = [
+            threading.Thread(target=_worker, name=f"segment-{i}", daemon=True)
+            for i in range(connections)
+        ]
+        started = time.time()
+        for t in threads:
+            t.start()
+
+        last_save = started
+        try:
+            while any(t.is_alive() for t in threads):
+                for t in threads:
+                    t.join(PROGRESS_INTERVAL / len(threads))
+                now = time.time()
+                with lock:
+                    current = downloaded
+                    finished = set(done)
+                speed = (current - resumed_bytes) / max(now - started, 1e-3)
+                self._hook_progress({
+                    "status": "downloading",
+                    "downloaded_bytes": current,
+                    "total_bytes": total,
+                    "tmpfilename": tmpfilename,
+                    "filename": filename,
+                    "elapsed": now - started,
+                    "speed": speed,
+                    "eta": (total - current) / speed if speed > 0 else None,
+                    "throttled": throttle is not None,
+                }, info_dict)
+                if now - last_save >= STATE_SAVE_INTERVAL:
+                    self._save_state(state_path, total, chunk, finished)
+                    last_save = now
+        finally:
+            # A progress hook raising (e.g. user cancel) stops every connection
+            stop.set()
+            for t in threads:
+                t.join()
+            if len(done) < len(ranges):
+                self._save_state(state_path, total, chunk, done)
+
+        if errors:
+            self.report_error(f"segmented download failed: {errors[0]}")
+            return False
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "status": "finished",
+            "downloaded_bytes": total,
+            "total_bytes": total,
+            "filename": filename,
+            "elapsed": time.time() - started,
+        }, info_dict)
+        return True
+
+
+class SegmentedYoutubeDL(YoutubeDL):
+    """YoutubeDL that routes suitable progressive downloads to SegmentedHttpFD.
+
+    Per-download attributes, bound by downloader.SessionPool:
+    - `throttle`: bandwidth.JobThrottle handed to SegmentedHttpFD.
+    - `deferred`: when a list, post_process() records its arguments there
+      instead of running ffmpeg, so the caller can run them later. Files
+      with no ffmpeg work are post-processed right away.
+    - `metrics`: metrics.JobMetrics moved to the format-selection and
+      transfer phases as yt-dlp reaches them.
+    - `streams`: stream_cache.StreamCache consulted before each stream is
+      downloaded and filled after.
+    """
+
+    throttle = None
+    deferred = None
+    metrics = None
+    streams = None
+
+    def process_video_result(self, info_dict, download=True):
+        if self.metrics is not None:
+            self.metrics.enter(PHASE_FORMAT)
+        return super().process_video_result(info_dict, download=download)
+
+    def process_info(self, info_dict):
+        if self.metrics is not None:
+            self.metrics.enter(PHASE_TRANSFER)
+        return super().process_info(info_dict)
+
+    def dl(self, name, info, subtitle=False, test=False):
+        cache = None if test or subtitle or name == "-" else self.streams
+        if cache is not None and cache.fetch(info, name):
+            size = os.path.getsize(name)
+            for ph in self._progress_hooks:
+                ph({
+                    "status": "finished",
+                    "downloaded_bytes": size,
+                    "total_bytes": size,
+                    "filename": name,
+                    "cached": True,
+                    "info_dict": info,
+                })
+            # Counts as a real download so the same fixups run on the copy
+            return True, True
+        result = self._dl(name, info, subtitle, test)
+        if result[0] and cache is not None and os.path.exists(name):
+            cache.store(info, name)
+        return result
+
+    def _dl(self, name, info, subtitle, test):
+        if test or subtitle or name == "-" or not SegmentedHttpFD.suitable(info, self.params):
+            return super().dl(name, info, subtitle=subtitle, test=test)
+
+        fd = SegmentedHttpFD(self, self.params)
+        fd.throttle = self.throttle
+        for ph in self._progress_hooks:
+            fd.add_progress_hook(ph)
+        new_info = self._copy_infodict(info)
+        if new_info.get("http_headers") is None:
+            new_info["http_headers"] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
+    def post_process(self, filename, info, files_to_move=None):
+        # Only ffmpeg work is worth a PostProcessStage slot: audio extraction,
+        # or a merge or fixup queued for this file. Anything else (moving the
+        # file into place) finishes here on the download worker.
+        if self.deferred is None or not (self._pps["post_process"] or info.get("__postprocessors")):
+            return super().post_process(filename, info, files_to_move)
+        info["filepath"] = filename
+        # Copy: process_video_result prunes keys shared with the parent info afterwards
+        self.deferred.append((filename, dict(info), files_to_move))
+        return info
@@ -0,0 +1,500 @@
+"""YouTube Downloader - long-running job server with a local JSON HTTP API.
+
+One Downloader, worker pool and metadata cache serve every client, so the
+same video submitted by several clients is extracted and downloaded once:
+
+    python server.py -o /srv/videos --port 8750
+
+    POST   /jobs        {"url": ..., "fmt": ..., "quality": ..., "priority": ...}
+    GET    /jobs        list; ?since=<version>&wait=<s> long-polls for changes
+    GET    /jobs/<id>   one job
+    DELETE /jobs/<id>   withdraw this submission; cancels once nobody wants it
+    GET    /events      server-sent events ("job" and "progress")
+    GET    /metrics     Prometheus text (see metrics.py)
+"""
+
+import argparse
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from adaptive import DEFAULT_RETRIES, AdaptiveController, RetryPolicy
+from archive import DownloadArchive
+from bandwidth import BandwidthScheduler, parse_size
+from download_queue import (
+    DEFAULT_WORKERS,
+    MAX_WORKERS,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    SCHEDULE_FIFO,
+    SCHEDULES,
+    DownloadPool,
+    QueueItem,
+    QueueStore,
+)
+from downloader import (
+    AUDIO_QUALITIES,
+    DEFAULT_CONNECTIONS,
+    FORMAT_AUDIO_ONLY,
+    FORMAT_VIDEO_AUDIO,
+    FORMAT_VIDEO_ONLY,
+    VIDEO_QUALITIES,
+    Downloader,
+    get_data_dir,
+)
+from logsetup import setup_logging
+from metadata_cache import cache_key
+from metrics import Metrics
+from postprocess import PostProcessStage, default_workers
+from stream_cache import DEFAULT_MAX_BYTES, StreamCache
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_PORT = 8750
+PROGRESS_INTERVAL = 0.5  # min seconds between progress events per job
+MAX_WAIT = 60.0  # cap on a long-poll
+KEEPALIVE = 15.0  # seconds between SSE comments on an idle stream
+SUBSCRIBER_BACKLOG = 1000  # events buffered per SSE client before it is dropped
+KEEP_FINISHED = 500  # finished jobs kept for GET /jobs before the oldest are forgotten
+
+# A job that is queued, running or finished absorbs duplicate submissions;
+# failed or cancelled ones are retried by a new submission
+_LIVE = (QueueItem.STATUS_PENDING, QueueItem.STATUS_DOWNLOADING, QueueItem.STATUS_DONE)
+_FINISHED = (QueueItem.STATUS_DONE, QueueItem.STATUS_ERROR, QueueItem.STATUS_CANCELLED)
+
+
+class RequestError(Exception):
+    """Client error, reported as HTTP `status` with a JSON message."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class JobServer:
+    """Jobs shared by all clients, drained by one DownloadPool.
+
+    Submissions are keyed by (normalized URL, format, quality); a duplicate
+    of a live job returns that job and adds a client reference to it.
+    Every change bumps `version`, which long-polling clients wait on, and
+    is pushed to SSE subscribers. Only the `keep_finished` most recently
+    finished jobs are kept; older ones are forgotten, and submitting one of
+    them again starts a new download.
+    """
+
+    def __init__(
+        self, downloader: Downloader, pool: DownloadPool, output_dir: str, archive=None,
+        keep_finished: int = KEEP_FINISHED,
+    ):
+        self.downloader = downloader
+        self.pool = pool
+        self.output_dir = output_dir
+        self.archive = archive
+        self.keep_finished = keep_finished
+        self.version = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._queue = QueueStore()
+        self._jobs: dict[str, QueueItem] = {}
+        self._by_key: dict[tuple[str, str, str], QueueItem] = {}
+        self._refs: dict[str, int] = {}
+        self._progress: dict[str, dict] = {}
+        self._progress_sent: dict[str, float] = {}
+        self._finished: dict[str, None] = {}  # ids in the order they finished
+        self._subscribers: list[queue.Queue] = []
+
+    def start(self):
+        # A permanent producer keeps idle workers waiting for new jobs instead of exiting
+        self.pool.begin_producer()
+        self.pool.start(self._queue, self.output_dir, on_update=self._on_update, on_progress=self._on_progress)
+
+    def stop(self):
+        self.pool.end_producer()
+        self.pool.cancel_all()
+
+    # ── Jobs ─────────────────────────────────────────────────────────
+
+    def submit(self, url: str, fmt: str, quality: Optional[str], priority: int = PRIORITY_NORMAL) -> list[dict]:
+        """Queue `url` (every entry, for a playlist). Returns the job dicts."""
+        if not url:
+            raise RequestError("url is required")
+        if fmt not in (FORMAT_VIDEO_AUDIO, FORMAT_VIDEO_ONLY, FORMAT_AUDIO_ONLY):
+            raise RequestError(f"unknown fmt: {fmt!r}")
+        # bool is an int subclass; JSON true is not a priority. Priority is a
+        # bandwidth weight, so it must be positive
+        if not isinstance(priority, int) or isinstance(priority, bool) or priority < PRIORITY_LOW:
+            raise RequestError(f"priority must be an integer of at least {PRIORITY_LOW}, not {priority!r}")
+        if quality is None:
+            quality = "192" if fmt == FORMAT_AUDIO_ONLY else "best"
+        if quality not in (AUDIO_QUALITIES if fmt == FORMAT_AUDIO_ONLY else VIDEO_QUALITIES):
+            raise RequestError(f"invalid quality {quality!r} for {fmt}")
+
+        try:
+            # Served from the shared metadata cache when another client asked first
+            info = self.downloader.fetch_info(url)
+        except Exception as e:
+            raise RequestError(f"could not resolve {url}: {e}", 422) from None
+        if info.is_playlist:
+            candidates = [
+                QueueItem(
+                    e.get("url") or e.get("webpage_url", ""), e.get("title", "Unknown"), fmt, quality,
+                    video_id=e.get("id", ""), extractor=e.get("ie_key", ""), priority=priority, source=url,
+                )
+                for e in info.entries
+            ]
+        else:
+            candidates = [QueueItem(url, info.title, fmt, quality, info=info, priority=priority)]
+
+        jobs = []
+        added = False
+        with self._lock:
+            for item in candidates:
+                if not item.url:
+                    continue
+                key = (cache_key(item.url), fmt, quality)
+                existing = self._by_key.get(key)
+                if existing is not None and existing.status in _LIVE:
+                    self._refs[existing.id] += 1
+                    jobs.append(dict(self._job_dict(existing), deduplicated=True))
+                    continue
+                if self.archive is not None and self.archive.contains_item(item):
+                    item.status = QueueItem.STATUS_DONE
+                else:
+                    self._queue.append(item)
+                    added = True
+                self._jobs[item.id] = item
+                self._by_key[key] = item
+                self._refs[item.id] = 1
+                jobs.append(self._job_dict(item))
+                if item.status in _FINISHED:
+                    self._finish(item)
+            self._bump()
+        if added:
+            self.pool.notify_items()
+        for job in jobs:
+            self._publish("job", job)
+        return jobs
+
+    def cancel(self, job_id: str) -> dict:
+        """Drop one client reference; the download is cancelled when none remain."""
+        with self._lock:
+            item = self._get(job_id)
+            self._refs[job_id] = max(self._refs[job_id] - 1, 0)
+            orphaned = self._refs[job_id] == 0
+        if orphaned:
+            self.pool.cancel(item)
+        return self.job(job_id)
+
+    def job(self, job_id: str) -> dict:
+        with self._lock:
+            return self._job_dict(self._get(job_id))
+
+    def jobs(self, since: Optional[int] = None, wait: float = 0.0) -> dict:
+        """All jobs, after waiting up to `wait` seconds for a version newer than `since`."""
+        deadline = time.monotonic() + min(wait, MAX_WAIT)
+        with self._lock:
+            while since is not None and self.version <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return {"version": self.version, "jobs": [self._job_dict(i) for i in self._jobs.values()]}
+
+    def _get(self, job_id: str) -> QueueItem:
+        item = self._jobs.get(job_id)
+        if item is None:
+            raise RequestError(f"no such job: {job_id}", 404)
+        return item
+
+    def _job_dict(self, item: QueueItem) -> dict:
+        return {
+            "id": item.id,
+            "url": item.url,
+            "title": item.title,
+            "fmt": item.fmt,
+            "quality": item.quality,
+            "priority": item.priority,
+            "status": item.status,
+            "post_status": item.post_status,
+            "error": item.error_msg,
+            "attempts": item.attempts,
+            # Seconds from the last start to the predicted and the actual completion
+            "expected_secs": round(item.expected_at - item.started_at, 2) if item.expected_at else None,
+            "actual_secs": round(item.finished_at - item.started_at, 2) if item.finished_at else None,
+            "clients": self._refs.get(item.id, 0),
+            "progress": self._progress.get(item.id),
+        }
+
+    def _finish(self, item: QueueItem):
+        """Note that `item` finished and forget the oldest finished jobs past keep_finished."""
+        self._progress.pop(item.id, None)
+        if item.id not in self._jobs:
+            return
+        self._finished[item.id] = None
+        while len(self._finished) > self.keep_finished:
+            old = self._jobs.pop(next(iter(self._finished)))
+            del self._finished[old.id]
+            self._refs.pop(old.id, None)
+            self._progress_sent.pop(old.id, None)
+            key = (cache_key(old.url), old.fmt, old.quality)
+            if self._by_key.get(key) is old:
+                del self._by_key[key]
+            if old in self._queue:
+                self._queue.remove(old)
+
+    def _bump(self):
+        self.version += 1
+        self._changed.notify_all()
+
+    # ── Pool callbacks (worker threads) ──────────────────────────────
+
+    def _on_update(self, item: QueueItem):
+        with self._lock:
+            if item.status != QueueItem.STATUS_DOWNLOADING:
+                self._progress_sent.pop(item.id, None)
+            if item.status in _FINISHED:
+                self._finish(item)
+            self._bump()
+            job = self._job_dict(item)
+        self._publish("job", job)
+
+    def _on_progress(self, item: QueueItem, d: dict):
+        now = time.monotonic()
+        progress = {
+            "status": d.get("status"),
+            "downloaded": d.get("downloaded_bytes") or 0,
+            "total": d.get("total_bytes") or d.get("total_bytes_estimate"),
+            "speed": d.get("speed"),
+            "eta": d.get("eta"),
+        }
+        with self._lock:
+            self._progress[item.id] = progress
+            if d.get("status") == "downloading" and now - self._progress_sent.get(item.id, 0.0) < PROGRESS_INTERVAL:
+                return
+            self._progress_sent[item.id] = now
+        self._publish("progress", dict(progress, id=item.id))
+
+    # ── Server-sent events ───────────────────────────────────────────
+
+    def subscribe(self) -> queue.Queue:
+        events: queue.Queue = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue):
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def _publish(self, event: str, data: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait((event, data))
+            except queue.Full:
+                # A client that stopped reading must not hold up the workers
+                log.warning("Dropping a stalled event subscriber")
+                self.unsubscribe(events)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ApiServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        log.info(f"{self.client_address[0]} {format % args}")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str):
+        jobs = self.server.jobs
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        path = parts.path.rstrip("/")
+        job_match = re.fullmatch(r"/jobs/([0-9a-f]+)", path)
+        try:
+            if method == "GET" and path == "/events":
+                return self._stream_events()
+            if method == "GET" and path == "/metrics":
+                return self._send(200, jobs.downloader.metrics.prometheus().encode(), "text/plain; version=0.0.4")
+            if method == "GET" and path == "/jobs":
+                since = int(query["since"]) if "since" in query else None
+                return self._json(200, jobs.jobs(since, float(query.get("wait", 0))))
+            if method == "POST" and path == "/jobs":
+                body = self._read_json()
+                created = jobs.submit(
+                    body.get("url", ""), body.get("fmt", FORMAT_VIDEO_AUDIO), body.get("quality"),
+                    body.get("priority", PRIORITY_NORMAL),
+                )
+                return self._json(201 if any(not j.get("deduplicated") for j in created) else 200, {"jobs": created})
+            if job_match and method == "GET":
+                return self._json(200, jobs.job(job_match.group(1)))
+            if job_match and method == "DELETE":
+                return self._json(200, jobs.cancel(job_match.group(1)))
+            raise RequestError("not found", 404)
+        except RequestError as e:
+            self._json(e.status, {"error": str(e)})
+        except ValueError as e:
+            self._json(400, {"error": str(e)})
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise RequestError("body must be JSON") from None
+        if not isinstance(body, dict):
+            raise RequestError("body must be a JSON object")
+        return body
+
+    def _json(self, status: int, data: dict):
+        self._send(status, json.dumps(data).encode(), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self):
+        jobs = self.server.jobs
+        events = jobs.subscribe()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            # Current state first, so a client needs no separate GET /jobs
+            for job in jobs.jobs()["jobs"]:
+                self._write_event("job", job)
+            while not self.server.stopping.is_set():
+                try:
+                    event, data = events.get(timeout=KEEPALIVE)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                self._write_event(event, data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            jobs.unsubscribe(events)
+
+    def _write_event(self, event: str, data: dict):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+        self.wfile.flush()
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], jobs: JobServer):
+        super().__init__(address, _Handler)
+        self.jobs = jobs
+        self.stopping = threading.Event()
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve the downloader over a local JSON HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-o", "--output", default=str(Path.home() / "Downloads"), help="Output directory")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_WORKERS, help="Parallel downloads")
+    parser.add_argument("-N", "--connections", type=int, default=DEFAULT_CONNECTIONS, help="Connections per download")
+    parser.add_argument(
+        "--order", choices=list(SCHEDULES), default=SCHEDULE_FIFO,
+        help="Which queued job starts next: submission order, smallest first, or taking turns between submissions",
+    )
+    parser.add_argument("-r", "--limit-rate", type=parse_size, help="Total download rate limit, e.g. 2M (bytes/s)")
+    parser.add_argument(
+        "--ffmpeg-workers", type=int, default=default_workers(),
+        help="Cores for merging/converting after download (0 = convert inline)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=DEFAULT_RETRIES,
+        help="Retry a failed download up to this many times, with growing delays (0 = never)",
+    )
+    parser.add_argument(
+        "--no-adaptive", action="store_true",
+        help="Keep --jobs and --connections fixed instead of lowering them while throttled",
+    )
+    parser.add_argument("--stream-cache", metavar="DIR", help="Keep downloaded streams here for reuse by later jobs")
+    parser.add_argument(
+        "--stream-cache-size", type=parse_size, default=DEFAULT_MAX_BYTES,
+        help="Evict least recently used streams past this size, e.g. 10G",
+    )
+    parser.add_argument(
+        "--archive", default=str(get_data_dir() / "archive.txt"),
+        help="Download archive used to skip videos already downloaded",
+    )
+    parser.add_argument("--no-archive", action="store_true", help="Download even if already archived")
+    parser.add_argument(
+        "--keep-jobs", type=int, default=KEEP_FINISHED,
+        help="Finished jobs to keep listing before the oldest are forgotten",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if not 1 <= args.jobs <= MAX_WORKERS:
+        parser.error(f"--jobs must be between 1 and {MAX_WORKERS}")
+    setup_logging(logging.StreamHandler(sys.stderr), logging.INFO if args.verbose else logging.WARNING)
+
+    downloader = Downloader(
+        connections=args.connections, bandwidth=BandwidthScheduler(args.limit_rate), metrics=Metrics(),
+        stream_cache=StreamCache(Path(args.stream_cache), args.stream_cache_size) if args.stream_cache else None,
+    )
+    archive = DownloadArchive(Path(args.archive))
+    postprocess = PostProcessStage(args.ffmpeg_workers) if args.ffmpeg_workers > 0 else None
+    pool = DownloadPool(
+        downloader, workers=args.jobs, archive=archive, postprocess=postprocess,
+        retry=RetryPolicy(args.retries) if args.retries > 0 else None,
+        controller=None if args.no_adaptive else AdaptiveController(args.jobs, args.connections),
+        schedule=SCHEDULES[args.order](),
+    )
+    jobs = JobServer(
+        downloader, pool, args.output, archive=None if args.no_archive else archive, keep_finished=args.keep_jobs,
+    )
+    httpd = ApiServer((args.host, args.port), jobs)
+
+    jobs.start()
+    print(f"Serving on http://{args.host}:{httpd.server_address[1]}", file=sys.stderr, flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.stopping.set()
+        httpd.server_close()
+        jobs.stop()
+        if postprocess is not None:
+            postprocess.shutdown(wait=False)
+        downloader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
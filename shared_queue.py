@@ -0,0 +1,329 @@
+"""Download queue shared by several machines through one SQLite file.
+
+Every node adds items to the same database on a shared filesystem and
+claims them one at a time under a time-limited lease, renewed by a
+heartbeat while the download runs. A lease that runs out (its node died or
+lost the share) puts the item back as pending for another node, so a
+playlist drains across N nodes with each item downloaded once.
+
+The database keeps SQLite's default rollback journal: WAL needs shared
+memory, which only works between processes on one host. Leases are
+wall-clock times, so nodes need roughly synchronized clocks.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+from adaptive import backoff_delay
+from download_queue import DownloadPool, QueueItem, QueueStore
+from metadata_cache import cache_key
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_LEASE = 120.0  # seconds a claim stays valid without a heartbeat
+MAX_CLAIMS = 5  # leases an item may lose before it is marked failed
+POLL_INTERVAL = 2.0  # seconds between claim attempts while others hold the work
+BUSY_TIMEOUT = 30.0  # seconds to wait for another node's write lock
+SETTLE_ATTEMPTS = 5  # tries to record a result before leaving it to the lease
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS items ("
+    "seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, key TEXT NOT NULL UNIQUE, "
+    "url TEXT NOT NULL, title TEXT NOT NULL, fmt TEXT NOT NULL, quality TEXT NOT NULL, "
+    "video_id TEXT NOT NULL, extractor TEXT NOT NULL, priority INTEGER NOT NULL, "
+    "status TEXT NOT NULL, error TEXT NOT NULL DEFAULT '', node TEXT, lease_until REAL, "
+    "claims INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS items_status ON items (status, seq)",
+)
+
+
+def default_node() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SharedQueue:
+    """Items in a shared SQLite file, claimed by nodes under leases.
+
+    Items are keyed by (normalized URL, format, quality): adding one that
+    another node already queued is a no-op, and re-adding a failed or
+    cancelled one queues it again. `path` may be the database file or a
+    directory to create it in.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        node: Optional[str] = None,
+        lease: float = DEFAULT_LEASE,
+        max_claims: int = MAX_CLAIMS,
+    ):
+        path = Path(path)
+        if path.is_dir():
+            path = path / "queue.sqlite3"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.node = node or default_node()
+        self.lease = lease
+        self.max_claims = max_claims
+        self._lock = threading.Lock()
+        # Autocommit; writes use explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        with self._transaction() as db:
+            for statement in _SCHEMA:
+                db.execute(statement)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def add(self, items: Iterable[QueueItem]) -> list[QueueItem]:
+        """Queue `items`; returns the ones that were not already queued."""
+        added = []
+        now = time.time()
+        with self._transaction() as db:
+            for item in items:
+                cursor = db.execute(
+                    "INSERT INTO items (id, key, url, title, fmt, quality, video_id, extractor, priority, "
+                    "status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET status = excluded.status, error = '', claims = 0, "
+                    "updated_at = excluded.updated_at WHERE status IN (?, ?)",
+                    (
+                        item.id, f"{cache_key(item.url)} {item.fmt} {item.quality}", item.url, item.title,
+                        item.fmt, item.quality, item.video_id, item.extractor, item.priority,
+                        QueueItem.STATUS_PENDING, now, QueueItem.STATUS_ERROR, QueueItem.STATUS_CANCELLED,
+                    ),
+                )
+                if cursor.rowcount:
+                    added.append(item)
+        return added
+
+    def claim(self) -> Optional[QueueItem]:
+        """Lease the oldest pending item to this node, or None if there is none.
+
+        Expired leases are returned to pending first (or failed, after
+        `max_claims` of them).
+        """
+        now = time.time()
+        with self._transaction() as db:
+            failed = db.execute(
+                "UPDATE items SET status = ?, error = ?, node = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_until < ? AND claims >= ?",
+                (
+                    QueueItem.STATUS_ERROR, f"lease expired {self.max_claims} times", now,
+                    QueueItem.STATUS_DOWNLOADING, now, self.max_claims,
+                ),
+            ).rowcount
+            requeued = db.execute(
+                "UPDATE items SET status = ?, node = NULL, updated_at = ? WHERE status = ? AND lease_until < ?",
+                (QueueItem.STATUS_PENDING, now, QueueItem.STATUS_DOWNLOADING, now),
+            ).rowcount
+            if failed or requeued:
+                log.warning(f"Shared queue: {requeued} expired lease(s) requeued, {failed} failed")
+            row = db.execute(
+                "SELECT id, url, title, fmt, quality, video_id, extractor, priority FROM items "
+                "WHERE status = ? ORDER BY seq LIMIT 1",
+                (QueueItem.STATUS_PENDING,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE items SET status = ?, node = ?, lease_until = ?, claims = claims + 1, updated_at = ? "
+                "WHERE id = ?",
+                (QueueItem.STATUS_DOWNLOADING, self.node, now + self.lease, now, row[0]),
+            )
+        item_id, url, title, fmt, quality, video_id, extractor, priority = row
+        return QueueItem(
+            url, title, fmt, quality, item_id=item_id, video_id=video_id, extractor=extractor, priority=priority,
+        )
+
+    def heartbeat(self, item_ids: Iterable[str]) -> set[str]:
+        """Extend this node's leases on `item_ids`; returns the ids whose lease was lost."""
+        lost = set()
+        now = time.time()
+        with self._transaction() as db:
+            for item_id in item_ids:
+                renewed = db.execute(
+                    "UPDATE items SET lease_until = ?, updated_at = ? WHERE id = ? AND node = ? AND status = ?",
+                    (now + self.lease, now, item_id, self.node, QueueItem.STATUS_DOWNLOADING),
+                ).rowcount
+                if not renewed:
+                    lost.add(item_id)
+        return lost
+
+    def finish(self, item: QueueItem) -> bool:
+        """Record a claimed item's final status. False if the lease was lost meanwhile."""
+        return self._settle(item, item.status, item.error_msg)
+
+    def release(self, item: QueueItem) -> bool:
+        """Give a claimed item back (e.g. on shutdown) for any node to take."""
+        return self._settle(item, QueueItem.STATUS_PENDING, "")
+
+    def _settle(self, item: QueueItem, status: str, error: str) -> bool:
+        with self._transaction() as db:
+            return bool(db.execute(
+                "UPDATE items SET status = ?, error = ?, node = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND node = ? AND status = ?",
+                (status, error, time.time(), item.id, self.node, QueueItem.STATUS_DOWNLOADING),
+            ).rowcount)
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+
+    def drained(self) -> bool:
+        """True when nothing is pending or leased on any node."""
+        counts = self.counts()
+        return not counts.get(QueueItem.STATUS_PENDING) and not counts.get(QueueItem.STATUS_DOWNLOADING)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class SharedQueueWorker:
+    """Feeds a local DownloadPool from a SharedQueue and reports results back.
+
+    Claims up to `pool.workers` items at a time into `items` (the store the
+    pool drains), renews their leases every third of the lease, and settles
+    them through on_update(), which the pool's on_update callback must call.
+    The pool is held open until every local source has finished adding and
+    the shared queue is drained on all nodes, so items freed by another
+    node's expired lease are still picked up.
+    """
+
+    def __init__(self, shared: SharedQueue, pool: DownloadPool, items: QueueStore):
+        self.shared = shared
+        self.pool = pool
+        self.items = items
+        self._lock = threading.Lock()
+        self._claimed: dict[str, QueueItem] = {}
+        self._lost: set[str] = set()
+        self._sources = 0
+        self._stopping = threading.Event()
+        self._done = threading.Event()
+
+    def begin_source(self):
+        """Register a local producer still adding to the shared queue."""
+        with self._lock:
+            self._sources += 1
+
+    def end_source(self):
+        with self._lock:
+            self._sources = max(self._sources - 1, 0)
+
+    def start(self):
+        self.pool.begin_producer()
+        threading.Thread(target=self._feed, name="shared-feed", daemon=True).start()
+        threading.Thread(target=self._heartbeat, name="shared-heartbeat", daemon=True).start()
+
+    def stop(self):
+        """Stop claiming and hand claimed items not yet started back to other nodes.
+
+        Items cancelled from now on are released too.
+        """
+        self._stopping.set()
+        with self._lock:
+            claimed = list(self._claimed.values())
+        for item in claimed:
+            if item.status == QueueItem.STATUS_PENDING:
+                # Comes back through on_update() as cancelled, which releases it
+                self.pool.cancel(item)
+
+    def on_update(self, item: QueueItem):
+        if item.status not in (QueueItem.STATUS_DONE, QueueItem.STATUS_ERROR, QueueItem.STATUS_CANCELLED):
+            return
+        with self._lock:
+            if self._claimed.pop(item.id, None) is None:
+                return
+            lost = item.id in self._lost
+        if lost:
+            return
+        for attempt in range(SETTLE_ATTEMPTS):
+            try:
+                if item.status == QueueItem.STATUS_CANCELLED:
+                    self.shared.release(item)
+                elif not self.shared.finish(item):
+                    log.warning(f"Shared queue: lease on {item.url} expired before it finished")
+                return
+            except sqlite3.OperationalError as e:
+                log.warning(f"Shared queue: could not record {item.url} ({e}), retrying")
+                time.sleep(backoff_delay(attempt, POLL_INTERVAL))
+        # Its lease runs out and another node downloads it again
+        log.error(f"Shared queue: gave up recording {item.url}")
+
+    def _feed(self):
+        failures = 0
+        try:
+            while not self._stopping.is_set():
+                with self._lock:
+                    room = len(self._claimed) < self.pool.workers
+                    sources = self._sources
+                    claimed = len(self._claimed)
+                if room:
+                    try:
+                        item = self.shared.claim()
+                        drained = item is None and not sources and not claimed and self.shared.drained()
+                    except sqlite3.OperationalError as e:
+                        # Locked past BUSY_TIMEOUT or the share hiccuped; the queue is still there
+                        log.warning(f"Shared queue: claim failed ({e}), retrying")
+                        self._stopping.wait(backoff_delay(failures, POLL_INTERVAL, self.shared.lease))
+                        failures += 1
+                        continue
+                    failures = 0
+                    if item is not None:
+                        log.info(f"Shared queue: claimed {item.url}")
+                        with self._lock:
+                            self._claimed[item.id] = item
+                        self.items.append(item)
+                        self.pool.notify_items()
+                        continue
+                    if drained:
+                        break
+                self._stopping.wait(POLL_INTERVAL)
+        finally:
+            self._done.set()
+            self.pool.end_producer()
+
+    def _heartbeat(self):
+        interval = self.shared.lease / 3
+        delay = interval
+        failures = 0
+        while not self._stopping.wait(delay):
+            delay = interval
+            with self._lock:
+                ids = list(self._claimed)
+            if not ids:
+                if self._done.is_set():
+                    return
+                continue
+            try:
+                lost = self.shared.heartbeat(ids)
+            except sqlite3.OperationalError as e:
+                # Retry well within the lease rather than letting it lapse
+                log.warning(f"Shared queue: heartbeat failed ({e}), retrying")
+                delay = backoff_delay(failures, POLL_INTERVAL, interval)
+                failures += 1
+                continue
+            failures = 0
+            for item_id in lost:
+                with self._lock:
+                    item = self._claimed.get(item_id)
+                    self._lost.add(item_id)
+                if item is not None:
+                    log.warning(f"Shared queue: lost the lease on {item.url}; another node has it")
+                    self.pool.cancel(item)
@@ -0,0 +1,67 @@
+"""Startup timing marks, so cold-start regressions can be tracked across builds."""
+
+import importlib
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger("ytdl")
+
+# Imported lazily by worker threads. Loading them during warm-up keeps
+# Pillow's import (tens of ms, under the import lock) off the first
+# thumbnail request.
+WARM_IMPORTS = ("PIL.Image",)
+
+
+class StartupTimer:
+    """Records named milestones relative to process start.
+
+    Each mark is kept only the first time it is hit, so callers can mark
+    "first_fetch" from every fetch without special-casing. report() appends
+    one JSON line per run to a history file for later comparison.
+    """
+
+    def __init__(self, t0: Optional[float] = None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self._lock = threading.Lock()
+        self.marks: dict[str, float] = {}
+
+    def mark(self, name: str) -> bool:
+        """Record `name` if not yet seen. Returns True when newly recorded."""
+        with self._lock:
+            if name in self.marks:
+                return False
+            self.marks[name] = round((time.perf_counter() - self.t0) * 1000, 1)
+        log.info(f"Startup: {name} at {self.marks[name]} ms")
+        return True
+
+    def elapsed_ms(self, name: str) -> Optional[float]:
+        return self.marks.get(name)
+
+    def report(self, path: Optional[Path] = None) -> dict:
+        """Return the marks, and append them to `path` as a JSON line if given."""
+        with self._lock:
+            data = {
+                "time": time.time(),
+                "frozen": bool(getattr(sys, "frozen", False)),
+                "platform": sys.platform,
+                "marks_ms": dict(self.marks),
+            }
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(data) + "\n")
+            except OSError:
+                log.warning(f"Could not write startup report to {path}")
+        return data
+
+
+def warm_imports():
+    """Import WARM_IMPORTS ahead of first use."""
+    for name in WARM_IMPORTS:
+        importlib.import_module(name)
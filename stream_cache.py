@@ -0,0 +1,159 @@
+"""Local cache of downloaded media streams, shared across formats of a video.
+
+A stream is addressed by (extractor, video id, format id): the same video
+queued as video+audio and then as MP3 resolves to the same audio stream,
+which the second job takes from here instead of the network. Streams are
+hard-linked in (no copy, and yt-dlp deleting its intermediate file leaves
+the cached one intact); one on another filesystem is not cached, since
+copying every download would double its disk writes. Hits are linked out,
+or copied when that fails. The least recently used streams are evicted
+past `max_bytes`.
+"""
+
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+_UNSAFE = re.compile(r"[^\w-]")
+
+# Stream kinds, from the format's codecs
+KIND_AUDIO = "a"
+KIND_VIDEO = "v"
+KIND_MUXED = "av"
+
+
+def _safe(part: str) -> str:
+    return _UNSAFE.sub("_", part)
+
+
+def stream_kind(info: dict) -> str:
+    if info.get("vcodec") == "none":
+        return KIND_AUDIO
+    if info.get("acodec") == "none":
+        return KIND_VIDEO
+    return KIND_MUXED
+
+
+class StreamCache:
+    """Size-bounded LRU directory of streams: root/<extractor>/<id>.<format>.<kind>.<ext>."""
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Path, int] = OrderedDict()
+        self._size = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        # File mtimes approximate recency across restarts; fetch() touches hits
+        found = []
+        for path in self.root.glob("*/*"):
+            if path.suffix == ".tmp":
+                path.unlink(missing_ok=True)
+                continue
+            st = path.stat()
+            found.append((st.st_mtime, path, st.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._size += size
+
+    def path_for(self, info: dict) -> Optional[Path]:
+        """Cache path of the stream `info` (a yt-dlp format-level info dict) describes."""
+        extractor = info.get("extractor_key") or info.get("extractor")
+        video_id, format_id, ext = info.get("id"), info.get("format_id"), info.get("ext")
+        if not (extractor and video_id and format_id and ext) or info.get("is_live"):
+            return None
+        name = f"{_safe(video_id)}.{_safe(format_id)}.{stream_kind(info)}.{_safe(ext)}"
+        return self.root / _safe(extractor) / name
+
+    def fetch(self, info: dict, dest: str) -> bool:
+        """Place the cached stream at `dest`. False on a miss."""
+        path = self.path_for(info)
+        if path is None:
+            return False
+        with self._lock:
+            if path not in self._entries:
+                return False
+            self._entries.move_to_end(path)
+        try:
+            _place(path, Path(dest))
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back (e.g. by another process's eviction)
+            with self._lock:
+                self._size -= self._entries.pop(path, 0)
+            return False
+        with self._lock:
+            self.hits += 1
+        log.info(f"Stream cache hit: {path.name}")
+        return True
+
+    def store(self, info: dict, src: str):
+        """Add the finished stream file `src`, evicting older streams if over the limit."""
+        path = self.path_for(info)
+        if path is None:
+            return
+        try:
+            size = os.path.getsize(src)
+            if size > self.max_bytes:
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.unlink(missing_ok=True)
+            try:
+                os.link(src, tmp)
+            except OSError as e:
+                log.debug(f"Not caching {src}, it can't be hard-linked: {e}")
+                return
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning(f"Could not cache stream {src}: {e}")
+            return
+        with self._lock:
+            self._size += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            self.stores += 1
+            evicted = []
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old)
+        for old in evicted:
+            old.unlink(missing_ok=True)
+            log.info(f"Stream cache evicted {old.name}")
+
+    def audio_formats(self, extractor: str, video_id: str) -> list[str]:
+        """Format ids of cached audio-only streams of a video, most recently used first."""
+        prefix = f"{_safe(video_id)}."
+        folder = self.root / _safe(extractor)
+        with self._lock:
+            paths = [p for p in reversed(self._entries) if p.parent == folder and p.name.startswith(prefix)]
+        formats = []
+        for path in paths:
+            parts = path.name[len(prefix):].split(".")
+            if len(parts) == 3 and parts[1] == KIND_AUDIO:
+                formats.append(parts[0])
+        return formats
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "stores": self.stores}
+
+
+def _place(src: Path, dest: Path):
+    """Hard-link `src` to `dest`, copying when linking isn't possible (other filesystem)."""
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
@@ -0,0 +1,165 @@
+"""Single-pass download + merge/transcode: ffmpeg reads the format URLs directly.
+
+The normal path writes each stream to disk, then ffmpeg reads them back
+and writes the merged/converted file. Here one ffmpeg process pulls the
+streams over HTTP and writes the final file once, stream-copying whatever
+the output container can hold. Imported lazily (it imports yt_dlp).
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+from yt_dlp.utils import DownloadError
+
+log = logging.getLogger("ytdl")
+
+# Audio codecs an .mp4 can carry without re-encoding
+_MP4_AUDIO = ("mp4a", "aac", "mp3", "opus", "ac-3", "ec-3", "flac")
+
+
+def _codec(fmt: dict, key: str) -> str:
+    """Codec family ("avc1", "opus", ...), "none" if absent, "" if unknown."""
+    return (fmt.get(key) or "").split(".")[0].lower()
+
+
+def build_command(
+    ffmpeg: str,
+    formats: list[dict],
+    output: str,
+    audio_bitrate: Optional[str] = None,
+    faststart: bool = False,
+    cookiejar=None,
+) -> list[str]:
+    """ffmpeg command that reads `formats` and writes `output` in one pass.
+
+    With `audio_bitrate`, only audio is kept and encoded to MP3 unless the
+    source already is MP3. Otherwise streams go into MP4, copying video and
+    copying audio when MP4 supports its codec.
+    """
+    cmd = [ffmpeg, "-y", "-hide_banner", "-nostdin", "-loglevel", "error", "-progress", "pipe:1", "-nostats"]
+    for fmt in formats:
+        cookies = cookiejar.get_cookies_for_url(fmt["url"]) if cookiejar is not None else []
+        if cookies:
+            cmd += ["-cookies", "".join(
+                f"{c.name}={c.value}; path={c.path}; domain={c.domain};\r\n" for c in cookies
+            )]
+        headers = fmt.get("http_headers") or {}
+        if headers:
+            cmd += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+        cmd += ["-i", fmt["url"]]
+
+    if audio_bitrate:
+        audio = next((i for i, f in enumerate(formats) if _codec(f, "acodec") != "none"), 0)
+        cmd += ["-map", f"{audio}:a:0", "-vn"]
+        if _codec(formats[audio], "acodec") == "mp3":
+            cmd += ["-c:a", "copy"]
+        else:
+            cmd += ["-c:a", "libmp3lame", "-b:a", f"{audio_bitrate}k"]
+        cmd += ["-f", "mp3"]
+    else:
+        for i, fmt in enumerate(formats):
+            # "?" keeps ffmpeg going when a stream of unknown codec is absent
+            if _codec(fmt, "vcodec") != "none":
+                cmd += ["-map", f"{i}:v:0?"]
+            if _codec(fmt, "acodec") != "none":
+                cmd += ["-map", f"{i}:a:0?"]
+        cmd += ["-c:v", "copy"]
+        acodecs = {_codec(f, "acodec") for f in formats} - {"none", ""}
+        cmd += ["-c:a", "copy" if acodecs <= set(_MP4_AUDIO) else "aac"]
+        if faststart:
+            cmd += ["-movflags", "+faststart"]
+        cmd += ["-f", "mp4"]
+    return cmd + [output]
+
+
+def stream_download(
+    ydl,
+    info: dict,
+    output: str,
+    progress_hook: Callable[[dict], None],
+    audio_bitrate: Optional[str] = None,
+    scratch_dir: Optional[str] = None,
+):
+    """Fetch the selected formats of processed `info` into `output` in one pass.
+
+    The partial file lives in `scratch_dir` (or next to `output`) and is
+    moved into place when ffmpeg finishes, so `output` is written once.
+    `progress_hook` receives yt-dlp-shaped progress dicts; raising from it
+    stops ffmpeg. The partial file is discarded on failure.
+    """
+    ffpp = FFmpegPostProcessor(ydl)
+    if not ffpp.available:
+        raise DownloadError("single-pass mode needs ffmpeg")
+
+    formats = info.get("requested_formats") or [info]
+    total = sum(f.get("filesize") or f.get("filesize_approx") or 0 for f in formats) or None
+    duration = info.get("duration") or 0
+    tmp_dir = Path(scratch_dir) if scratch_dir else Path(output).parent
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    tmp = str(tmp_dir / (Path(output).name + ".part"))
+
+    cmd = build_command(
+        ffpp.executable, formats, tmp, audio_bitrate, faststart=bool(scratch_dir), cookiejar=ydl.cookiejar,
+    )
+    log.info(f"Single-pass ffmpeg: {len(formats)} input(s) -> {output}")
+    started = time.time()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    stderr: list[str] = []
+    reader = threading.Thread(target=lambda: stderr.extend(proc.stderr), daemon=True)
+    reader.start()
+    try:
+        fields: dict[str, str] = {}
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            fields[key] = value
+            if key != "progress":
+                continue
+            size_text, time_text = fields.get("total_size", ""), fields.get("out_time_us", "")
+            written = int(size_text) if size_text.isdigit() else 0
+            out_us = int(time_text) if time_text.isdigit() else 0
+            elapsed = time.time() - started
+            if total and duration:
+                # Output size tracks input poorly when transcoding; use media time instead
+                downloaded = min(int(total * out_us / 1e6 / duration), total)
+            else:
+                downloaded = written
+            speed = downloaded / elapsed if elapsed > 0 else None
+            progress_hook({
+                "status": "downloading",
+                "downloaded_bytes": downloaded,
+                "total_bytes": total,
+                "tmpfilename": tmp,
+                "filename": output,
+                "elapsed": elapsed,
+                "speed": speed,
+                "eta": (total - downloaded) / speed if total and speed else None,
+            })
+        proc.wait()
+        reader.join()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    if proc.returncode != 0:
+        Path(tmp).unlink(missing_ok=True)
+        detail = "".join(stderr).strip().splitlines()[-1:] or [f"exit code {proc.returncode}"]
+        raise DownloadError(f"ffmpeg failed: {detail[0]}")
+
+    size = os.path.getsize(tmp)
+    shutil.move(tmp, output)
+    progress_hook({
+        "status": "finished",
+        "downloaded_bytes": size,
+        "total_bytes": size,
+        "filename": output,
+        "elapsed": time.time() - started,
+    })
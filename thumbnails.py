@@ -0,0 +1,170 @@
+"""Thumbnail loading with a bounded worker pool, request dedup and two cache tiers."""
+
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.request import urlopen
+
+log = logging.getLogger("ytdl")
+
+DEFAULT_WORKERS = 4
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 5000
+FETCH_TIMEOUT = 10
+
+_YTIMG_ID = re.compile(r"/vi(?:_webp)?/([\w-]{11})/")
+
+
+def thumbnail_key(url: str) -> str:
+    """Video id for YouTube thumbnail URLs, otherwise a hash of the URL."""
+    m = _YTIMG_ID.search(url)
+    if m:
+        return m.group(1)
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+class ThumbnailLoader:
+    """Fetches, resizes and caches thumbnails off the UI thread.
+
+    - A fixed-size thread pool bounds concurrent fetches.
+    - Concurrent requests for the same (key, size) share one fetch.
+    - A memory LRU holds ready-to-display images produced by `make_image`
+      (e.g. a CTkImage); the disk tier holds already-resized JPEGs, so
+      neither the download nor the resample is repeated across restarts.
+
+    Callbacks run on a worker thread (or the caller's, on a memory hit).
+    GUI callers must marshal them onto their own thread.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        make_image: Optional[Callable[[Any, tuple[int, int]], Any]] = None,
+        workers: int = DEFAULT_WORKERS,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        disk_entries: int = DEFAULT_DISK_ENTRIES,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.make_image = make_image or (lambda img, size: img)
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb")
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[tuple[str, tuple[int, int]], Any] = OrderedDict()
+        self._inflight: dict[tuple[str, tuple[int, int]], list[Callable[[Any], None]]] = {}
+        self._disk_writes = 0
+
+    def request(
+        self,
+        url: str,
+        size: tuple[int, int],
+        callback: Callable[[Any], None],
+        key: Optional[str] = None,
+    ):
+        """Deliver the thumbnail for `url` at `size` to `callback` once ready.
+
+        `key` identifies the image in the caches (the video id when known).
+        Failures are logged and the callback is not called.
+        """
+        cache_id = (key or thumbnail_key(url), size)
+        with self._lock:
+            image = self._memory.get(cache_id)
+            if image is not None:
+                self._memory.move_to_end(cache_id)
+            else:
+                waiters = self._inflight.get(cache_id)
+                if waiters is not None:
+                    waiters.append(callback)
+                    return
+                self._inflight[cache_id] = [callback]
+        if image is not None:
+            callback(image)
+            return
+        self._executor.submit(self._load, url, cache_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ── Workers ──────────────────────────────────────────────────────
+
+    def _load(self, url: str, cache_id: tuple[str, tuple[int, int]]):
+        image = None
+        try:
+            image = self.make_image(self._load_resized(url, *cache_id), cache_id[1])
+        except Exception as e:
+            log.warning(f"Thumbnail failed: {url} ({e})")
+
+        with self._lock:
+            waiters = self._inflight.pop(cache_id, [])
+            if image is not None:
+                self._memory[cache_id] = image
+                while len(self._memory) > self.memory_entries:
+                    self._memory.popitem(last=False)
+        if image is None:
+            return
+        for callback in waiters:
+            try:
+                callback(image)
+            except Exception:
+                log.exception("Thumbnail callback failed")
+
+    def _load_resized(self, url: str, key: str, size: tuple[int, int]):
+        from PIL import Image
+
+        path = self._disk_path(key, size)
+        if path is not None and path.exists():
+            try:
+                img = Image.open(path)
+                img.load()
+            except OSError:
+                path.unlink(missing_ok=True)
+            else:
+                # _prune_disk() drops the oldest mtimes first; mark this one as recently used
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return img
+
+        data = urlopen(url, timeout=FETCH_TIMEOUT).read()
+        img = Image.open(io.BytesIO(data)).convert("RGB")
+        img = img.resize(size, Image.LANCZOS)
+        if path is not None:
+            self._store(img, path)
+        return img
+
+    def _disk_path(self, key: str, size: tuple[int, int]) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{key}_{size[0]}x{size[1]}.jpg"
+
+    def _store(self, img, path: Path):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            img.save(tmp, "JPEG", quality=90)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning(f"Thumbnail cache write failed: {path} ({e})")
+            return
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % 100 == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Drop the least recently used files once the disk tier exceeds its entry limit."""
+        try:
+            files = sorted(self.cache_dir.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+        except OSError:
+            return
+        for path in files[: max(len(files) - self.disk_entries, 0)]:
+            path.unlink(missing_ok=True)